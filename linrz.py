@@ -1,16 +1,37 @@
 #!/usr/bin/env python3
 """
 YUSR LinRZ - Universal Compression Tool with GUI
-Supports: .zip, .rar, .7z, .tar.gz, .tar.bz2, .tar.xz, and more
+Supports: .zip, .rar, .7z, .tar, .tar.gz, .tar.bz2, .tar.xz, and more
 """
 
+import bisect
+import functools
 import os
 import sys
 import zipfile
 import tarfile
 import shutil
+import bz2
+import contextlib
+import fnmatch
+import gzip
+import hashlib
+import io
+import itertools
+import lzma
+import mmap
+import re
+import sqlite3
+import struct
 import threading
+import time
+import zlib
+from array import array
+import multiprocessing
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from stat import S_ISREG
 from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
@@ -21,6 +42,12 @@ try:
 except ImportError:
     HAS_7Z = False
 
+try:
+    import pwd
+    import grp
+except ImportError:
+    pwd = grp = None
+
 try:
     import rarfile
     HAS_RAR = True
@@ -28,180 +55,2465 @@ except ImportError:
     HAS_RAR = False
 
 
+# stat follows symlinks; symlink marks entries that tar stores as links
+_SourceEntry = namedtuple('_SourceEntry', ['path', 'arcname', 'stat', 'symlink'])
+
+
+def _scan_source(source, skipped=None):
+    """Yield every regular file under source with the stat result of one os.scandir pass
+    
+    Directories that cannot be read are left out, as os.walk does, and
+    their paths are appended to skipped when a list is given.
+    """
+    if source.is_file():
+        yield _SourceEntry(str(source), source.name, source.stat(), source.is_symlink())
+        return
+    
+    stack = [(str(source), source.name)]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            if skipped is not None:
+                skipped.append(directory)
+            continue
+        with entries:
+            for entry in entries:
+                arcname = f"{prefix}/{entry.name}" if prefix else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, arcname))
+                elif entry.is_file():
+                    yield _SourceEntry(entry.path, arcname, entry.stat(), entry.is_symlink())
+
+
+def _zip_info(entry, compress_type):
+    """Build a ZipInfo for a scanned file without statting it again"""
+    st = entry.stat
+    zinfo = zipfile.ZipInfo(entry.arcname, time.localtime(st.st_mtime)[:6])
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.file_size = st.st_size
+    zinfo.compress_type = compress_type
+    return zinfo
+
+
+@functools.lru_cache(maxsize=None)
+def _owner_names(uid, gid):
+    """Look up user and group names once per (uid, gid) pair"""
+    uname = gname = ''
+    if pwd:
+        try:
+            uname = pwd.getpwuid(uid)[0]
+        except KeyError:
+            pass
+    if grp:
+        try:
+            gname = grp.getgrgid(gid)[0]
+        except KeyError:
+            pass
+    return uname, gname
+
+
+def _tar_info(tf, entry):
+    """Build a TarInfo for a scanned file the way TarFile.gettarinfo() would"""
+    # Like tarfile without dereference, a symlink is archived as the link itself
+    st = os.lstat(entry.path) if entry.symlink else entry.stat
+    tarinfo = tf.tarinfo(entry.arcname)
+    tarinfo.mode = st.st_mode
+    tarinfo.uid = st.st_uid
+    tarinfo.gid = st.st_gid
+    tarinfo.mtime = st.st_mtime
+    tarinfo.uname, tarinfo.gname = _owner_names(st.st_uid, st.st_gid)
+    
+    inode = (st.st_ino, st.st_dev)
+    if st.st_nlink > 1 and inode in tf.inodes and entry.arcname != tf.inodes[inode]:
+        tarinfo.type = tarfile.LNKTYPE
+        tarinfo.linkname = tf.inodes[inode]
+    elif entry.symlink:
+        tarinfo.type = tarfile.SYMTYPE
+        tarinfo.linkname = os.readlink(entry.path)
+    else:
+        tarinfo.type = tarfile.REGTYPE
+        tarinfo.size = st.st_size
+        if inode[0]:
+            tf.inodes[inode] = entry.arcname
+    return tarinfo
+
+
+# Formats that are already compressed or encrypted; deflating them again
+# burns CPU for next to no gain, so they are always stored.
+_STORED_EXTENSIONS = frozenset({
+    '.7z', '.aac', '.apk', '.avi', '.br', '.bz2', '.cab', '.deb', '.docx', '.epub',
+    '.flac', '.gif', '.gpg', '.gz', '.heic', '.jar', '.jpeg', '.jpg', '.lz4', '.lzma',
+    '.m4a', '.m4v', '.mkv', '.mov', '.mp3', '.mp4', '.odt', '.ogg', '.opus', '.parquet',
+    '.png', '.pptx', '.rar', '.rpm', '.tgz', '.webm', '.webp', '.whl', '.xlsx', '.xz',
+    '.zip', '.zst',
+})
+
+# Size of the leading sample used to judge whether a member is compressible
+_SAMPLE_SIZE = 64 * 1024
+
+
+def _read_blocks(f, length=None, block_size=1024 * 1024):
+    """Yield the rest of an open file, or its next length bytes, block by block
+    
+    Blocks are read straight into one reused buffer and yielded as
+    memoryview slices of it, so no bytes object is allocated per block.
+    A block is only valid until the next one is requested.
+    """
+    expected = os.fstat(f.fileno()).st_size - f.tell() if length is None else length
+    # Small files get a small buffer; a file that grows is still read to its end
+    buffer = bytearray(min(block_size, max(expected, 64 * 1024)))
+    remaining = -1 if length is None else length
+    with memoryview(buffer) as view:
+        while remaining:
+            if 0 < remaining < len(view):
+                size = f.readinto(view[:remaining])
+            else:
+                size = f.readinto(view)
+            if not size:
+                return
+            if remaining > 0:
+                remaining -= size
+            with view[:size] as block:
+                yield block
+
+
+# Largest single in-kernel copy, so progress and cancellation keep up
+_COPY_STEP = 8 * 1024 * 1024
+
+
+def _is_os_file(f):
+    """Whether f is a plain file object over a regular file, which the kernel can copy to and from"""
+    # Compressing wrappers such as GzipFile expose the fileno() of the file
+    # below them, so only the io module's own file classes qualify.
+    if not isinstance(f, (io.FileIO, io.BufferedReader, io.BufferedWriter, io.BufferedRandom)):
+        return False
+    try:
+        return S_ISREG(os.fstat(f.fileno()).st_mode)
+    except (OSError, ValueError):
+        return False
+
+
+def _copy_range(src, offset, dst, count):
+    """Copy count bytes from offset in src to the current position of dst
+    
+    Both must satisfy _is_os_file(). The bytes move inside the kernel with
+    copy_file_range() or sendfile() where the platform and file systems
+    allow it, through a buffer otherwise. Yields the size of every step;
+    the total only falls short of count if src ends early.
+    """
+    dst.flush()
+    position = dst.tell()
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    end = offset + count
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    sendfile = getattr(os, 'sendfile', None) if sys.platform.startswith('linux') else None
+    while offset < end:
+        step = min(end - offset, _COPY_STEP)
+        copied = None
+        if copy_file_range is not None:
+            try:
+                copied = copy_file_range(src_fd, dst_fd, step, offset, position)
+            except OSError:
+                # Older kernels refuse copies across file systems
+                copy_file_range = None
+        if copied is None and sendfile is not None:
+            try:
+                os.lseek(dst_fd, position, os.SEEK_SET)
+                copied = sendfile(dst_fd, src_fd, offset, step)
+            except OSError:
+                sendfile = None
+        if copied is None:
+            src.seek(offset)
+            data = src.read(step)
+            dst.seek(position)
+            dst.write(data)
+            dst.flush()
+            copied = len(data)
+        if not copied:
+            break
+        offset += copied
+        position += copied
+        yield copied
+    dst.seek(position)
+
+
+def _has_stored_extension(arcname):
+    return os.path.splitext(arcname)[1].lower() in _STORED_EXTENSIONS
+
+
+def _zip_compression_for(arcname, sample):
+    """Pick ZIP_STORED for data that deflate would not shrink, ZIP_DEFLATED otherwise"""
+    if _has_stored_extension(arcname):
+        return zipfile.ZIP_STORED
+    sample = sample[:_SAMPLE_SIZE]
+    # A fast trial compression of the first block stands in for an entropy estimate
+    if len(sample) >= 4096 and len(zlib.compress(sample, 1)) > len(sample) * 0.97:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _deflate_member(entry, compresslevel):
+    """Compress one file into a raw stream, returning its ZipInfo and list of data chunks"""
+    zinfo = _zip_info(entry, zipfile.ZIP_DEFLATED)
+    chunks = []
+    crc = 0
+    with open(entry.path, 'rb') as f:
+        block = f.read(1024 * 1024)
+        zinfo.compress_type = _zip_compression_for(entry.arcname, block)
+        if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        else:
+            compressor = None
+        for block in itertools.chain((block,), _read_blocks(f)):
+            crc = zlib.crc32(block, crc)
+            # Blocks share one buffer, so stored data has to be copied out
+            chunks.append(compressor.compress(block) if compressor else bytes(block))
+    if compressor:
+        chunks.append(compressor.flush())
+    # Kept as chunks: joining them would briefly hold the member twice
+    zinfo.CRC = crc
+    zinfo.compress_size = sum(len(chunk) for chunk in chunks)
+    return zinfo, chunks
+
+
+def _zip_write_raw(zf, zinfo, data):
+    """Commit an already-compressed member into an open ZipFile
+    
+    data is the compressed bytes or an iterable of chunks of them.
+    """
+    _zip_begin_raw(zf, zinfo)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = (data,)
+    for chunk in data:
+        zf.fp.write(chunk)
+    _zip_end_raw(zf, zinfo)
+
+
+def _zip_begin_raw(zf, zinfo):
+    """Write the local header of a raw member whose sizes and CRC are already set"""
+    # zipfile has no public API for raw members, so this and _zip_end_raw()
+    # mirror what ZipFile.open(..., 'w') does around a member's data.
+    zf._writecheck(zinfo)
+    zf._didModify = True
+    zinfo.header_offset = zf.fp.tell()
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zf.fp.write(zinfo.FileHeader(zip64))
+
+
+def _zip_end_raw(zf, zinfo):
+    """Record a raw member once its data has been written after the header"""
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+    zf.start_dir = zf.fp.tell()
+
+
+def _zip_data_offset(fp, zinfo):
+    """Offset of a member's data in its archive, read from the local header"""
+    resume = fp.tell()
+    fp.seek(zinfo.header_offset)
+    header = fp.read(zipfile.sizeFileHeader)
+    fp.seek(resume)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local file header for {zinfo.filename}")
+    name_size, extra_size = struct.unpack('<HH', header[26:30])
+    return zinfo.header_offset + zipfile.sizeFileHeader + name_size + extra_size
+
+
+def _zip_target_path(member, output_path):
+    """Where ZipFile.extract() would write member below output_path"""
+    arcname = member.filename.replace('/', os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    # Like zipfile, drop empty, '.' and '..' components so nothing escapes output_path
+    arcname = os.path.sep.join(part for part in arcname.split(os.path.sep)
+                               if part not in ('', os.path.curdir, os.path.pardir))
+    if os.path.sep == '\\':
+        arcname = zipfile.ZipFile._sanitize_windows_name(arcname, os.path.sep)
+    return os.path.normpath(os.path.join(output_path, arcname))
+
+
+def _zip_read_raw(zf, zinfo):
+    """Yield a member's compressed bytes straight from its archive, without inflating
+    
+    zf may be the archive being written: the file position is restored
+    around every read so the copy can be written out in between.
+    """
+    fp = zf.fp
+    offset = _zip_data_offset(fp, zinfo)
+    remaining = zinfo.compress_size
+    while remaining:
+        resume = fp.tell()
+        fp.seek(offset)
+        chunk = fp.read(min(remaining, 1024 * 1024))
+        fp.seek(resume)
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {zinfo.filename}")
+        offset += len(chunk)
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _find_duplicates(entries, workers):
+    """Map the arcname of each file repeating an earlier file's content to that file's arcname"""
+    # Only files sharing a size can be identical, so only those are hashed
+    by_size = {}
+    for entry in entries:
+        # A symlink is not its target's content once tar stores it as a link
+        if entry.stat.st_size and not entry.symlink:
+            by_size.setdefault(entry.stat.st_size, []).append(entry)
+    candidates = [entry for group in by_size.values() if len(group) > 1 for entry in group]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = dict(zip((entry.arcname for entry in candidates),
+                           pool.map(_file_digest, (entry.path for entry in candidates))))
+    
+    duplicates = {}
+    first_seen = {}
+    for entry in entries:
+        digest = digests.get(entry.arcname)
+        if digest is None:
+            continue
+        key = (entry.stat.st_size, digest)
+        if key in first_seen:
+            duplicates[entry.arcname] = first_seen[key]
+        else:
+            first_seen[key] = entry.arcname
+    return duplicates
+
+
+def _file_crc(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for block in _read_blocks(f):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def _deflate_block(block, zdict, compresslevel, last):
+    """Raw-deflate one block primed with the tail of the previous block"""
+    if zdict:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    # A sync flush ends the block on a byte boundary so the next block's
+    # deflate data can simply be appended (the same trick pigz uses).
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _xz_varint(value):
+    """Encode an integer as an xz multibyte integer"""
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+# Dictionary size liblzma uses for presets 0-9
+_XZ_PRESET_DICT_SIZES = (256 << 10, 1 << 20, 2 << 20, 4 << 20, 4 << 20, 8 << 20, 8 << 20, 16 << 20, 32 << 20, 64 << 20)
+
+
+def _xz_dict_size_property(dict_size):
+    """Encode the one-byte LZMA2 filter property for a dictionary size"""
+    # Byte p stands for (2 | (p & 1)) << (p // 2 + 11); 40 means 4 GiB - 1
+    for prop in range(40):
+        if (2 | (prop & 1)) << (prop // 2 + 11) >= dict_size:
+            return bytes([prop])
+    return bytes([40])
+
+
+def _xz_block(block, preset):
+    """Compress one block into a complete xz Block with a CRC32 check"""
+    dict_size = _XZ_PRESET_DICT_SIZES[preset]
+    if preset >= 7:
+        # Presets 7-9 only differ by a dictionary larger than one block,
+        # which would cost each worker hundreds of MB for no gain.
+        dict_size = max(len(block), 4096)
+    filters = [{'id': lzma.FILTER_LZMA2, 'preset': preset, 'dict_size': dict_size}]
+    compressor = lzma.LZMACompressor(format=lzma.FORMAT_RAW, filters=filters)
+    data = compressor.compress(block) + compressor.flush()
+    
+    # Block header: flags carry both sizes, then a single LZMA2 filter
+    properties = _xz_dict_size_property(dict_size)
+    header = bytearray(b'\x00\xc0')
+    header += _xz_varint(len(data)) + _xz_varint(len(block))
+    header += _xz_varint(lzma.FILTER_LZMA2) + _xz_varint(len(properties)) + properties
+    header += b'\x00' * (-(len(header) + 4) % 4)
+    header[0] = (len(header) + 4) // 4 - 1
+    header += struct.pack('<I', zlib.crc32(header))
+    
+    unpadded_size = len(header) + len(data) + 4
+    padding = b'\x00' * (-len(data) % 4)
+    return header + data + padding + struct.pack('<I', zlib.crc32(block)), unpadded_size, len(block)
+
+
+class _ParallelBlockWriter:
+    """Write-only file object compressing fixed-size blocks in a thread pool"""
+    
+    BLOCK_SIZE = 1024 * 1024
+    # Whether close() must emit a final block even when no data is buffered
+    FINAL_BLOCK_REQUIRED = False
+    
+    def __init__(self, fileobj, workers=None):
+        self.fileobj = fileobj
+        self.workers = workers or os.cpu_count() or 1
+        self.closed = False
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._size = 0
+        self.fileobj.write(self._header())
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(cancel_futures=True)
+            self.closed = True
+    
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.BLOCK_SIZE:
+            block = bytes(self._buffer[:self.BLOCK_SIZE])
+            del self._buffer[:self.BLOCK_SIZE]
+            self._submit(block, last=False)
+        return len(data)
+    
+    def tell(self):
+        return self._size + len(self._buffer)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        if self.closed:
+            return
+        if self._buffer or self.FINAL_BLOCK_REQUIRED:
+            self._submit(bytes(self._buffer), last=True)
+            self._buffer.clear()
+        while self._pending:
+            self._commit(self._pending.popleft().result())
+        self.fileobj.write(self._trailer())
+        self._pool.shutdown()
+        self.closed = True
+    
+    def _submit(self, block, last):
+        self._pending.append(self._pool.submit(*self._block_job(block, last)))
+        self._size += len(block)
+        # Bound the number of blocks held in memory
+        while len(self._pending) > self.workers * 2:
+            self._commit(self._pending.popleft().result())
+    
+    def _header(self):
+        return b''
+    
+    def _trailer(self):
+        return b''
+    
+    def _block_job(self, block, last):
+        raise NotImplementedError
+    
+    def _commit(self, result):
+        self.fileobj.write(result)
+
+
+class _ParallelGzipWriter(_ParallelBlockWriter):
+    """Produces one gzip member from blocks deflated in parallel"""
+    
+    WINDOW_SIZE = 32 * 1024
+    FINAL_BLOCK_REQUIRED = True
+    
+    def __init__(self, fileobj, compresslevel=9, workers=None):
+        self.compresslevel = compresslevel
+        self._dictionary = b''
+        self._crc = 0
+        super().__init__(fileobj, workers)
+    
+    def _header(self):
+        xfl = 2 if self.compresslevel == 9 else 4 if self.compresslevel == 1 else 0
+        return struct.pack('<4sIBB', b'\x1f\x8b\x08\x00', int(time.time()), xfl, 255)
+    
+    def _trailer(self):
+        return struct.pack('<II', self._crc, self._size & 0xffffffff)
+    
+    def _block_job(self, block, last):
+        job = (_deflate_block, block, self._dictionary, self.compresslevel, last)
+        self._dictionary = block[-self.WINDOW_SIZE:]
+        self._crc = zlib.crc32(block, self._crc)
+        return job
+
+
+class _ParallelXzWriter(_ParallelBlockWriter):
+    """Produces a single multi-block xz stream from blocks compressed in parallel"""
+    
+    BLOCK_SIZE = 8 * 1024 * 1024
+    # Stream flags selecting CRC32 as the integrity check
+    STREAM_FLAGS = b'\x00\x01'
+    
+    def __init__(self, fileobj, preset=6, workers=None):
+        self.preset = preset
+        self._records = []
+        super().__init__(fileobj, workers)
+    
+    def _header(self):
+        return b'\xfd7zXZ\x00' + self.STREAM_FLAGS + struct.pack('<I', zlib.crc32(self.STREAM_FLAGS))
+    
+    def _trailer(self):
+        index = bytearray(b'\x00' + _xz_varint(len(self._records)))
+        for unpadded_size, uncompressed_size in self._records:
+            index += _xz_varint(unpadded_size) + _xz_varint(uncompressed_size)
+        index += b'\x00' * (-len(index) % 4)
+        index += struct.pack('<I', zlib.crc32(index))
+        
+        footer = struct.pack('<I', len(index) // 4 - 1) + self.STREAM_FLAGS
+        return bytes(index) + struct.pack('<I', zlib.crc32(footer)) + footer + b'YZ'
+    
+    def _block_job(self, block, last):
+        return (_xz_block, block, self.preset)
+    
+    def _commit(self, result):
+        data, unpadded_size, uncompressed_size = result
+        self._records.append((unpadded_size, uncompressed_size))
+        self.fileobj.write(data)
+
+
+class _ParallelBz2Writer(_ParallelBlockWriter):
+    """Produces a multi-stream bz2 file, one independent stream per block (like pbzip2)"""
+    
+    BLOCK_SIZE = 900 * 1000
+    
+    def __init__(self, fileobj, compresslevel=9, workers=None):
+        self.compresslevel = compresslevel
+        super().__init__(fileobj, workers)
+    
+    def _block_job(self, block, last):
+        return (bz2.compress, block, self.compresslevel)
+    
+    def _trailer(self):
+        # Empty input still needs one (empty) stream to be a valid bz2 file
+        return b'' if self._size else bz2.compress(b'', self.compresslevel)
+
+
+def _bz2_decompress_streams(data):
+    """Decompress consecutive bz2 streams, reporting whether the last one was complete"""
+    chunks = []
+    while data:
+        decompressor = bz2.BZ2Decompressor()
+        chunks.append(decompressor.decompress(data))
+        if not decompressor.eof:
+            return b''.join(chunks), False
+        data = decompressor.unused_data
+    return b''.join(chunks), True
+
+
+class _ParallelBz2Reader:
+    """Read-only file object decompressing the streams of a multi-stream bz2 file in parallel"""
+    
+    # Stream header followed by the first block's magic (the BCD digits of pi)
+    STREAM_START = re.compile(rb'BZh[1-9]\x31\x41\x59\x26\x53\x59')
+    
+    # Segments are decompressed whole, so only this much compressed data
+    # goes to a worker; from the first larger one on, the rest of the file
+    # is streamed on the reading thread instead.
+    SEGMENT_LIMIT = 4 * 1024 * 1024
+    
+    def __init__(self, path, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.closed = False
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._segments = self._find_segments()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._tail = None
+        self._fill_pending()
+    
+    @classmethod
+    def is_multistream(cls, path):
+        """Whether a second bz2 stream starts early enough in path to decompress in parallel"""
+        # Files from bzip2 or tar cjf hold one stream, which gains nothing here
+        with open(path, 'rb') as f:
+            head = f.read(cls.SEGMENT_LIMIT + len('BZh91AY&SY'))
+        return cls.STREAM_START.search(head, 1) is not None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _find_segments(self):
+        start = 0
+        for match in self.STREAM_START.finditer(self._mm, 1):
+            yield start, match.start()
+            start = match.start()
+        yield start, len(self._mm)
+    
+    def _fill_pending(self):
+        # Bound the number of decompressed segments held in memory
+        while len(self._pending) < self.workers * 2:
+            segment = next(self._segments, None)
+            if segment is None:
+                break
+            start, end = segment
+            if end - start > self.SEGMENT_LIMIT:
+                self._pending.append((start, end, None))
+                self._segments.close()
+                break
+            self._pending.append((start, end, self._pool.submit(
+                _bz2_decompress_streams, self._mm[start:end])))
+    
+    def _next_segment(self):
+        start, end, future = self._pending.popleft()
+        if future is not None:
+            data, complete = future.result()
+            # A stream header pattern can in theory occur inside compressed data;
+            # in that case the segment is incomplete and is merged with the next.
+            while not complete:
+                self._fill_pending()
+                if not self._pending:
+                    raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                _, end, future = self._pending.popleft()
+                if future is None:
+                    break
+                data, complete = _bz2_decompress_streams(self._mm[start:end])
+            else:
+                self._fill_pending()
+                return data
+        # Too large to hold decompressed: stream everything from here on
+        self._file.seek(start)
+        self._tail = bz2.BZ2File(self._file)
+        return b''
+    
+    def read(self, size=-1):
+        while (size < 0 or len(self._buffer) < size) and self._pending:
+            self._buffer += self._next_segment()
+        if self._tail is not None and (size < 0 or len(self._buffer) < size):
+            self._buffer += self._tail.read(size - len(self._buffer) if size >= 0 else -1)
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+    
+    def close(self):
+        if self.closed:
+            return
+        self._pool.shutdown(cancel_futures=True)
+        if self._tail is not None:
+            self._tail.close()
+        # Finish the segment scan first: its regex iterator holds the mmap buffer
+        self._segments.close()
+        self._mm.close()
+        self._file.close()
+        self.closed = True
+
+
+class OperationCancelled(Exception):
+    """Raised inside an engine job once its CancelToken has been set"""
+
+
+class CancelToken:
+    """Thread-safe flag another thread sets to stop a running engine job"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def check(self):
+        if self._event.is_set():
+            raise OperationCancelled("Operation cancelled")
+
+
+class ProgressEvent:
+    """Snapshot of a running job handed to the progress callback"""
+    
+    __slots__ = ('operation', 'files', 'bytes_done', 'current', 'message',
+                 'files_total', 'bytes_total', 'elapsed')
+    
+    def __init__(self, operation, files=0, bytes_done=0, current=None, message=None,
+                 files_total=None, bytes_total=None, elapsed=0.0):
+        self.operation = operation
+        self.files = files
+        self.bytes_done = bytes_done
+        self.current = current
+        self.message = message
+        self.files_total = files_total
+        self.bytes_total = bytes_total
+        self.elapsed = elapsed
+    
+    @property
+    def fraction(self):
+        """Share of the job done (0.0-1.0), or None when the total is unknown"""
+        if not self.bytes_total:
+            return None
+        return min(self.bytes_done / self.bytes_total, 1.0)
+    
+    @property
+    def throughput(self):
+        """Bytes processed per second so far"""
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def eta(self):
+        """Estimated seconds remaining, or None when it cannot be estimated"""
+        if not self.bytes_total or not self.throughput:
+            return None
+        return max(self.bytes_total - self.bytes_done, 0) / self.throughput
+    
+    def __str__(self):
+        if self.message:
+            return self.message
+        verb = 'Adding' if self.operation == 'compress' else 'Extracting'
+        text = f"{verb}: {self.current}"
+        if self.bytes_total:
+            text += f" ({self.fraction:.0%}, {CompressionEngine.format_size(self.throughput)}/s"
+            if self.eta is not None:
+                minutes, seconds = divmod(int(self.eta), 60)
+                text += f", ETA {minutes}:{seconds:02d}"
+            text += ")"
+        return text
+
+
+class ProgressReporter:
+    """Accumulates job counters and publishes them at most max_rate times per second
+    
+    Updates between publications are coalesced: only the latest state is
+    delivered, so per-member calls stay cheap however many members a job has.
+    Every update is also a cancellation point for the job's CancelToken.
+    """
+    
+    def __init__(self, callback=None, max_rate=10):
+        self.callback = callback
+        self.interval = 1.0 / max_rate
+        self.start(None)
+    
+    def start(self, operation, message=None, cancel_token=None):
+        self.operation = operation
+        self.cancel_token = cancel_token
+        self.files = 0
+        self.bytes_done = 0
+        self.current = None
+        self.files_total = None
+        self.bytes_total = None
+        self._member_bytes = 0
+        self._started = time.monotonic()
+        self._next_publish = 0.0
+        self._dirty = False
+        if message:
+            self.message(message)
+    
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+    
+    def set_totals(self, files, size):
+        self.files_total = files
+        self.bytes_total = size
+    
+    def add_bytes(self, size, current=None):
+        """Report progress inside a member that is still being processed"""
+        self.bytes_done += size
+        self._member_bytes += size
+        if current is not None:
+            self.current = current
+        self._changed()
+    
+    def advance(self, current, size=0):
+        """Report a finished member; bytes already passed to add_bytes() are not counted twice"""
+        self.files += 1
+        self.bytes_done += size - self._member_bytes
+        self._member_bytes = 0
+        self.current = current
+        self._changed()
+    
+    def message(self, text):
+        if self.callback:
+            self.callback(self._event(text))
+    
+    def finish(self):
+        if self.callback and self._dirty:
+            self._publish()
+    
+    def check_cancelled(self):
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+    
+    def _changed(self):
+        self.check_cancelled()
+        self._dirty = True
+        if self.callback and time.monotonic() >= self._next_publish:
+            self._publish()
+    
+    def _publish(self):
+        self._dirty = False
+        self._next_publish = time.monotonic() + self.interval
+        self.callback(self._event())
+    
+    def _event(self, message=None):
+        return ProgressEvent(self.operation, self.files, self.bytes_done, self.current, message,
+                             self.files_total, self.bytes_total, self.elapsed)
+
+
+class _CountingWriter:
+    """Write-only stream wrapper counting the bytes written through it
+    
+    It deliberately has no tell() or seek(), so ZipFile treats it as
+    unseekable and writes data descriptors instead of seeking back.
+    """
+    
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.count = 0
+    
+    def write(self, data):
+        self.fileobj.write(data)
+        self.count += len(data)
+        return len(data)
+    
+    def flush(self):
+        self.fileobj.flush()
+
+
+class _WriteBuffer:
+    """Write-only stream wrapper gathering small writes into large ones
+    
+    Writes at least buffer_size long go straight through. Unlike
+    _CountingWriter it has a tell(), which TarFile needs.
+    """
+    
+    def __init__(self, fileobj, buffer_size):
+        self.fileobj = fileobj
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._position = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+    
+    def write(self, data):
+        size = len(data)
+        if self._buffer and len(self._buffer) + size > self.buffer_size:
+            self.fileobj.write(self._buffer)
+            self._buffer.clear()
+        if size >= self.buffer_size:
+            self.fileobj.write(data)
+        else:
+            self._buffer += data
+        self._position += size
+        return size
+    
+    def tell(self):
+        return self._position
+    
+    def flush(self):
+        if self._buffer:
+            self.fileobj.write(self._buffer)
+            self._buffer.clear()
+        self.fileobj.flush()
+
+
+class _VolumeWriter:
+    """Write-only stream spreading its output over numbered volume files
+    
+    Bytes go straight to base.001, base.002, ... each capped at
+    volume_size; nothing is buffered beyond the file objects' own buffers.
+    tell() reports the position across all volumes but there is no seek(),
+    so ZipFile writes data descriptors as it does for other streams.
+    """
+    
+    def __init__(self, base_path, volume_size):
+        if volume_size <= 0:
+            raise ValueError("Volume size must be positive")
+        self.base_path = Path(base_path)
+        self.volume_size = volume_size
+        self.paths = []
+        self.count = 0
+        self._file = None
+        self._written = 0
+    
+    def _next_volume(self):
+        if self._file is not None:
+            self._file.close()
+        path = _volume_path(self.base_path, len(self.paths) + 1)
+        self._file = open(path, 'wb')
+        self.paths.append(path)
+        self._written = 0
+    
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        size = len(view)
+        while view:
+            if self._file is None or self._written == self.volume_size:
+                self._next_volume()
+            chunk = view[:self.volume_size - self._written]
+            self._file.write(chunk)
+            self._written += len(chunk)
+            view = view[len(chunk):]
+        self.count += size
+        return size
+    
+    def tell(self):
+        return self.count
+    
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+    
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        # Volumes left over from an earlier, longer run would be read back as part of this one
+        number = len(self.paths) + 1
+        while _volume_path(self.base_path, number).exists():
+            _volume_path(self.base_path, number).unlink()
+            number += 1
+    
+    def discard(self):
+        """Close and delete every volume written so far"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for path in self.paths:
+            path.unlink(missing_ok=True)
+
+
+class _VolumeReader:
+    """Seekable read-only view of numbered volume files as one continuous file"""
+    
+    def __init__(self, paths):
+        self.paths = paths
+        self._sizes = [os.path.getsize(path) for path in paths]
+        self._starts = []
+        total = 0
+        for size in self._sizes:
+            self._starts.append(total)
+            total += size
+        self.size = total
+        self._pos = 0
+        self._index = None
+        self._file = None
+    
+    def reopen(self):
+        """Independent reader over the same volumes, for another thread"""
+        return _VolumeReader(self.paths)
+    
+    def seekable(self):
+        return True
+    
+    def tell(self):
+        return self._pos
+    
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return offset
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(self.size - self._pos, 0)
+        chunks = []
+        while size > 0 and self._pos < self.size:
+            index = bisect.bisect_right(self._starts, self._pos) - 1
+            if index != self._index:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.paths[index], 'rb')
+                self._index = index
+            offset = self._pos - self._starts[index]
+            self._file.seek(offset)
+            chunk = self._file.read(min(size, self._sizes[index] - offset))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._pos += len(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._index = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_VOLUME_NUMBER = re.compile(r'\.(\d{3})$')
+
+
+def _volume_path(base_path, number):
+    return base_path.with_name(f'{base_path.name}.{number:03d}')
+
+
+def _volume_paths(first_volume):
+    """Every volume of a split archive given its first one (name ending .001), else None"""
+    match = _VOLUME_NUMBER.search(first_volume.name)
+    if match is None or int(match.group(1)) != 1:
+        return None
+    base_path = first_volume.with_name(first_volume.name[:match.start()])
+    paths = []
+    while _volume_path(base_path, len(paths) + 1).exists():
+        paths.append(_volume_path(base_path, len(paths) + 1))
+    return paths
+
+
+def _open_input(archive):
+    """Open a path for reading, or pass an already readable stream through"""
+    if hasattr(archive, 'read'):
+        return contextlib.nullcontext(archive)
+    return open(archive, 'rb')
+
+
+def _open_output(output_file):
+    """Open a path for writing, or pass an already writable stream through"""
+    if hasattr(output_file, 'write'):
+        return contextlib.nullcontext(output_file)
+    return open(output_file, 'wb')
+
+
+class _PrefixedReader:
+    """Read-only stream that replays bytes already consumed from the front of another stream"""
+    
+    def __init__(self, prefix, fileobj):
+        self.fileobj = fileobj
+        self._prefix = prefix
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        pass
+    
+    def read(self, size=-1):
+        if not self._prefix:
+            return self.fileobj.read(size)
+        if size < 0:
+            data = self._prefix + self.fileobj.read()
+            self._prefix = b''
+        else:
+            data = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+        return data
+
+
+def _open_compressed_stream(stream):
+    """Wrap a non-seekable stream in the decompressor its magic bytes call for"""
+    magic = b''
+    while len(magic) < 6:
+        chunk = stream.read(6 - len(magic))
+        if not chunk:
+            break
+        magic += chunk
+    reader = _PrefixedReader(magic, stream)
+    # Unlike tarfile's 'r|gz' and friends, these readers accept the
+    # multi-stream bz2 and xz files that the parallel writers produce.
+    if magic.startswith(b'\x1f\x8b'):
+        return gzip.GzipFile(fileobj=reader, mode='rb')
+    if magic.startswith(b'BZh'):
+        return bz2.BZ2File(reader)
+    if magic.startswith(b'\xfd7zXZ\x00'):
+        return lzma.LZMAFile(reader)
+    return reader
+
+
+def _tar_write_member(tf, tarinfo, blocks):
+    """Add a member to a TarFile, taking its data from an iterable of blocks"""
+    # Mirrors TarFile.addfile(), whose copyfileobj() would read the data
+    # into a fresh bytes object per 16 KiB chunk.
+    _tar_write_header(tf, tarinfo)
+    written = 0
+    for block in blocks:
+        tf.fileobj.write(block)
+        written += len(block)
+    _tar_end_member(tf, tarinfo, written)
+
+
+def _tar_write_header(tf, tarinfo):
+    tf._check('awx')
+    buf = tarinfo.tobuf(tf.format, tf.encoding, tf.errors)
+    tf.fileobj.write(buf)
+    tf.offset += len(buf)
+
+
+def _tar_end_member(tf, tarinfo, written):
+    """Pad a member's data, of which written bytes follow its header, to a whole block"""
+    if written != tarinfo.size:
+        raise OSError(f"unexpected end of data in {tarinfo.name}")
+    remainder = tarinfo.size % tarfile.BLOCKSIZE
+    if remainder:
+        tf.fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+        written += tarfile.BLOCKSIZE - remainder
+    tf.offset += written
+    tf.members.append(tarinfo)
+
+
+def _member_name(name):
+    """Normalise an archive member name for comparison"""
+    while name.startswith('./'):
+        name = name[2:]
+    return name.rstrip('/')
+
+
+def _has_glob_magic(pattern):
+    return any(char in pattern for char in '*?[')
+
+
+class _MemberFilter:
+    """Decides which archive members an extraction should write
+    
+    include holds exact member names or glob patterns; an exact directory
+    name also selects everything below it. Members matching any exclude
+    pattern are always skipped. pending maps each member still expected to
+    how many copies remain; it is known when every include entry is an
+    exact file name, or after narrow() has resolved the selection against
+    a listing. Once it empties, complete becomes True so sequential readers
+    can stop early.
+    """
+    
+    def __init__(self, include=None, exclude=None):
+        self.include = [_member_name(name) for name in include] if include else None
+        self.exclude = [_member_name(name) for name in exclude] if exclude else []
+        self.pending = None
+        self._resolved = False
+        if self.include and not any(map(_has_glob_magic, self.include)):
+            self.pending = dict.fromkeys(self.include, 1)
+    
+    @property
+    def active(self):
+        return self.include is not None or bool(self.exclude)
+    
+    @property
+    def complete(self):
+        return self.pending is not None and not self.pending
+    
+    def matches(self, name, is_dir=False):
+        name = _member_name(name)
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.exclude):
+            return False
+        if self.include is not None and not any(
+                name == pattern or name.startswith(pattern + '/') or fnmatch.fnmatchcase(name, pattern)
+                for pattern in self.include):
+            return False
+        # An exact directory name stays pending: its children are still to come
+        if self.pending is not None and name in self.pending and (self._resolved or not is_dir):
+            self.pending[name] -= 1
+            if not self.pending[name]:
+                del self.pending[name]
+        return True
+    
+    def narrow(self, listing):
+        """Resolve the selection to the exact members a listing of the archive says it matches"""
+        self.pending = None
+        selected = {}
+        for entry in listing:
+            if self.matches(entry.name, entry.is_dir):
+                name = _member_name(entry.name)
+                selected[name] = selected.get(name, 0) + 1
+        self.pending = selected
+        self._resolved = True
+
+
+def _seven_zip_batches(folders, limit):
+    """Group the members of consecutive 7z folders into batches of about limit uncompressed bytes"""
+    batch = []
+    size = 0
+    for group in folders:
+        batch.extend(group)
+        size += sum(member.uncompressed or 0 for member in group)
+        if size >= limit:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def _extract_7z_folder(archive, names, output_path):
+    """Extract the members of one solid 7z folder; runs in a worker process"""
+    with py7zr.SevenZipFile(archive, 'r') as zf:
+        zf.extract(output_path, targets=names)
+
+
+ArchiveEntry = namedtuple('ArchiveEntry', ['name', 'size', 'compressed_size', 'mtime', 'crc', 'is_dir'])
+
+
+class ArchiveListing:
+    """Compact, array-backed table of archive members
+    
+    Names are kept UTF-8 encoded in one buffer and the numeric columns in
+    typed arrays, so a listing costs a few dozen bytes per member instead
+    of a ZipInfo/TarInfo object each. Values the format does not record
+    (compressed size and CRC in tar) are -1. Indexing and iteration yield
+    ArchiveEntry tuples built on demand.
+    """
+    
+    __slots__ = ('_names', '_offsets', 'sizes', 'compressed_sizes', 'mtimes', 'crcs', '_dirs')
+    
+    def __init__(self):
+        self._names = bytearray()
+        self._offsets = array('Q', [0])
+        self.sizes = array('q')
+        self.compressed_sizes = array('q')
+        self.mtimes = array('q')
+        self.crcs = array('q')
+        self._dirs = bytearray()
+    
+    def append(self, name, size, compressed_size=-1, mtime=-1, crc=-1, is_dir=False):
+        self._names += name.encode('utf-8', 'surrogateescape')
+        self._offsets.append(len(self._names))
+        self.sizes.append(size)
+        self.compressed_sizes.append(-1 if compressed_size is None else compressed_size)
+        self.mtimes.append(-1 if mtime is None else int(mtime))
+        self.crcs.append(-1 if crc is None else crc)
+        self._dirs.append(bool(is_dir))
+    
+    def __len__(self):
+        return len(self.sizes)
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("archive listing index out of range")
+        return ArchiveEntry(self.name(index), self.sizes[index], self.compressed_sizes[index],
+                            self.mtimes[index], self.crcs[index], bool(self._dirs[index]))
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    def name(self, index):
+        return self._names[self._offsets[index]:self._offsets[index + 1]].decode('utf-8', 'surrogateescape')
+    
+    def names(self):
+        return [self.name(index) for index in range(len(self))]
+    
+    @property
+    def total_size(self):
+        return sum(self.sizes)
+    
+    @property
+    def total_compressed(self):
+        """Sum of known compressed sizes, or -1 if the format records none"""
+        known = [size for size in self.compressed_sizes if size >= 0]
+        return sum(known) if known else -1
+    
+    def to_bytes(self):
+        """Serialise the columns, zlib-compressed, for ListingCache"""
+        columns = [bytes(getattr(self, name)) for name in self.__slots__]
+        return zlib.compress(struct.pack(f'<{len(columns)}Q', *map(len, columns)) + b''.join(columns), 1)
+    
+    @classmethod
+    def from_bytes(cls, data):
+        data = zlib.decompress(data)
+        header = struct.Struct(f'<{len(cls.__slots__)}Q')
+        listing = cls()
+        pos = header.size
+        for name, size in zip(cls.__slots__, header.unpack_from(data)):
+            column = getattr(listing, name)
+            chunk = data[pos:pos + size]
+            if isinstance(column, array):
+                del column[:]
+                column.frombytes(chunk)
+            else:
+                column += chunk
+            pos += size
+        return listing
+
+
+class ListingCache:
+    """SQLite cache of archive listings under the user cache directory
+    
+    A listing is reused only while the archive's size, mtime and inode are
+    unchanged. Once the stored listings outgrow max_bytes the least
+    recently used are evicted. The cache is an optimisation: any database
+    error makes a lookup miss instead of failing the operation.
+    """
+    
+    MAX_BYTES = 64 * 1024 * 1024
+    
+    def __init__(self, path=None, max_bytes=None):
+        if path is None:
+            cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            path = os.path.join(cache_home, 'linrz', 'listings.sqlite3')
+        self.path = Path(path)
+        self.max_bytes = max_bytes or self.MAX_BYTES
+    
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5)
+        # Only effective on a new database; lets evictions shrink the file
+        db.execute('PRAGMA auto_vacuum = FULL')
+        db.execute('CREATE TABLE IF NOT EXISTS listings (path TEXT PRIMARY KEY, size INTEGER, '
+                   'mtime_ns INTEGER, inode INTEGER, used REAL, data BLOB)')
+        return db
+    
+    @staticmethod
+    def _key(archive):
+        archive = Path(archive).resolve()
+        stat = archive.stat()
+        return str(archive), stat.st_size, stat.st_mtime_ns, stat.st_ino
+    
+    def get(self, archive):
+        """Cached listing of an archive, or None if there is no current one"""
+        try:
+            path, size, mtime_ns, inode = self._key(archive)
+            with contextlib.closing(self._connect()) as db, db:
+                row = db.execute('SELECT size, mtime_ns, inode, data FROM listings WHERE path = ?',
+                                 (path,)).fetchone()
+                if row is None:
+                    return None
+                if row[:3] != (size, mtime_ns, inode):
+                    db.execute('DELETE FROM listings WHERE path = ?', (path,))
+                    return None
+                db.execute('UPDATE listings SET used = ? WHERE path = ?', (time.time(), path))
+            return ArchiveListing.from_bytes(row[3])
+        except (OSError, sqlite3.Error, zlib.error, struct.error):
+            return None
+    
+    def put(self, archive, listing):
+        try:
+            path, size, mtime_ns, inode = self._key(archive)
+            data = listing.to_bytes()
+            if len(data) > self.max_bytes:
+                return
+            with contextlib.closing(self._connect()) as db, db:
+                db.execute('INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?)',
+                           (path, size, mtime_ns, inode, time.time(), data))
+                self._evict(db)
+        except (OSError, sqlite3.Error):
+            pass
+    
+    def _evict(self, db):
+        total = 0
+        evicted = []
+        for path, size in db.execute('SELECT path, length(data) FROM listings ORDER BY used DESC'):
+            total += size
+            if total > self.max_bytes:
+                evicted.append((path,))
+        db.executemany('DELETE FROM listings WHERE path = ?', evicted)
+
+
+def _gzip_header_size(data):
+    """Length of the gzip member header at the start of data, or None if data is too short"""
+    if len(data) < 10:
+        return None
+    if data[:3] != b'\x1f\x8b\x08':
+        raise gzip.BadGzipFile("Not a gzipped file")
+    flags = data[3]
+    pos = 10
+    if flags & 4:
+        if len(data) < pos + 2:
+            return None
+        pos += 2 + int.from_bytes(data[pos:pos + 2], 'little')
+    for flag in (8, 16):
+        if flags & flag:
+            end = data.find(b'\x00', pos)
+            if end < 0:
+                return None
+            pos = end + 1
+    if flags & 2:
+        pos += 2
+    return pos if pos <= len(data) else None
+
+
+_AccessPoint = namedtuple('_AccessPoint', ['compressed', 'uncompressed', 'window'])
+
+
+class _GzipSeekReader:
+    """Sequential reader of a gzip file's data that can start at an access point
+    
+    Python's zlib cannot resume inflating at an arbitrary bit offset, so
+    access points are restricted to byte-aligned positions: the start of
+    each gzip member and the empty stored block (00 00 ff ff) closing a
+    sync or full flush, which pigz and _ParallelGzipWriter emit between
+    blocks. When span is set the reader records one such point roughly
+    every span bytes of output, each with its 32 KiB history window.
+    """
+    
+    CHUNK_SIZE = 256 * 1024
+    WINDOW_SIZE = 32 * 1024
+    FLUSH_MARKER = b'\x00\x00\xff\xff'
+    PROBE_SIZE = 16 * 1024
+    
+    def __init__(self, fileobj, point=None, span=None):
+        self.fileobj = fileobj
+        self.span = span
+        self.points = []
+        self._buffer = bytearray()
+        self._window = b''
+        self._input = b''
+        self._trailer = 0
+        self._eof = False
+        if point is None:
+            self._input_offset = 0
+            self._produced = 0
+            self._inflater = None
+        else:
+            fileobj.seek(point.compressed)
+            self._input_offset = point.compressed
+            self._produced = point.uncompressed
+            self._inflater = self._new_inflater(point.window)
+        self.position = self._produced
+    
+    @staticmethod
+    def _new_inflater(window):
+        if window:
+            return zlib.decompressobj(-15, zdict=window)
+        return zlib.decompressobj(-15)
+    
+    def read(self, size=-1):
+        while (size < 0 or len(self._buffer) < size) and not self._eof:
+            self._fill()
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.position += size
+        return data
+    
+    def skip_to(self, offset):
+        """Discard output up to the given uncompressed offset"""
+        while self.position < offset:
+            if not self.read(min(offset - self.position, self.CHUNK_SIZE)):
+                raise EOFError("Compressed file ended before the requested offset")
+    
+    def _fill(self):
+        data = self.fileobj.read(self.CHUNK_SIZE)
+        if not data:
+            self._process(final=True)
+            if self._inflater is not None:
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            self._eof = True
+            return
+        self._input += data
+        self._process(final=False)
+    
+    def _consume(self, size):
+        self._input = self._input[size:]
+        self._input_offset += size
+    
+    def _process(self, final):
+        while self._input:
+            if self._inflater is None:
+                if self._trailer:
+                    size = min(self._trailer, len(self._input))
+                    self._trailer -= size
+                    self._consume(size)
+                    continue
+                # Members may be followed by zero padding, as gzip itself allows
+                padding = len(self._input) - len(self._input.lstrip(b'\x00'))
+                if padding:
+                    self._consume(padding)
+                    continue
+                size = _gzip_header_size(self._input)
+                if size is None:
+                    return
+                self._consume(size)
+                self._inflater = self._new_inflater(None)
+                self._window = b''
+                self._record(None)
+                continue
+            
+            limit = len(self._input)
+            marker = -1
+            if self.span:
+                marker = self._input.find(self.FLUSH_MARKER)
+                if marker >= 0:
+                    limit = marker + len(self.FLUSH_MARKER)
+                elif not final:
+                    # Keep back a possibly split marker until more data arrives
+                    limit -= len(self.FLUSH_MARKER) - 1
+                    if limit <= 0:
+                        return
+            segment = self._input[:limit]
+            self._emit(self._inflater.decompress(segment))
+            if self._inflater.eof:
+                self._consume(len(segment) - len(self._inflater.unused_data))
+                self._inflater = None
+                self._trailer = 8
+                continue
+            self._consume(len(segment))
+            if marker >= 0:
+                self._record(self._window)
+    
+    def _emit(self, data):
+        if not data:
+            return
+        self._produced += len(data)
+        self._buffer += data
+        if self.span:
+            self._window = (self._window + data)[-self.WINDOW_SIZE:]
+    
+    def _record(self, window):
+        """Record an access point at the current input position if one is due"""
+        if not self.span:
+            return
+        if self.points and self._produced - self.points[-1].uncompressed < self.span:
+            return
+        if window is not None and not self._verify(window):
+            return
+        self.points.append(_AccessPoint(self._input_offset, self._produced,
+                                        zlib.compress(window, 1) if window else b''))
+    
+    def _verify(self, window):
+        """Check a flush marker candidate by inflating ahead from it both ways"""
+        if len(self._input) < self.PROBE_SIZE:
+            self._input += self.fileobj.read(self.PROBE_SIZE)
+        probe = self._input[:self.PROBE_SIZE]
+        try:
+            expected = self._inflater.copy().decompress(probe, 4096)
+            actual = self._new_inflater(window).decompress(probe, 4096)
+        except zlib.error:
+            # The marker bytes occurred inside compressed data, not at a block boundary
+            return False
+        return bool(expected) and expected == actual
+
+
+class GzipSeekIndex:
+    """Access points and tar member offsets for random access into a .tar.gz
+    
+    Saved next to the archive (archive name plus SUFFIX) and tied to its
+    size and mtime, so a rewritten archive never uses a stale index.
+    Archives written as a single deflate stream without flushes (plain
+    gzip, or GzipFile with one worker) only get a point per gzip member.
+    """
+    
+    MAGIC = b'LZSEEK1\n'
+    SUFFIX = '.seekidx'
+    SPAN = 8 * 1024 * 1024
+    
+    def __init__(self, archive_size, archive_mtime_ns, points, members):
+        self.archive_size = archive_size
+        self.archive_mtime_ns = archive_mtime_ns
+        self.points = points
+        self.members = members
+        self._positions = [point.uncompressed for point in points]
+    
+    @classmethod
+    def path_for(cls, archive):
+        archive = Path(archive)
+        return archive.with_name(archive.name + cls.SUFFIX)
+    
+    def point_before(self, offset):
+        """Nearest access point at or before an uncompressed offset, window unpacked"""
+        point = self.points[bisect.bisect_right(self._positions, offset) - 1]
+        return point._replace(window=zlib.decompress(point.window) if point.window else b'')
+    
+    def save(self, path):
+        chunks = [self.MAGIC, struct.pack('<QqII', self.archive_size, self.archive_mtime_ns,
+                                          len(self.points), len(self.members))]
+        for point in self.points:
+            chunks.append(struct.pack('<QQI', point.compressed, point.uncompressed, len(point.window)))
+            chunks.append(point.window)
+        for name, (offset, size, member_type) in self.members.items():
+            encoded = name.encode('utf-8', 'surrogateescape')
+            chunks.append(struct.pack('<QQBI', offset, size, member_type, len(encoded)))
+            chunks.append(encoded)
+        # Write then rename so a reader never sees a half-written index
+        tmp_path = Path(str(path) + '.tmp')
+        tmp_path.write_bytes(b''.join(chunks))
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        data = Path(path).read_bytes()
+        if not data.startswith(cls.MAGIC):
+            raise ValueError(f"Not a seek index: {path}")
+        pos = len(cls.MAGIC)
+        archive_size, archive_mtime_ns, point_count, member_count = struct.unpack_from('<QqII', data, pos)
+        pos += struct.calcsize('<QqII')
+        points = []
+        for _ in range(point_count):
+            compressed, uncompressed, window_size = struct.unpack_from('<QQI', data, pos)
+            pos += 20
+            points.append(_AccessPoint(compressed, uncompressed, data[pos:pos + window_size]))
+            pos += window_size
+        members = {}
+        for _ in range(member_count):
+            offset, size, member_type, name_size = struct.unpack_from('<QQBI', data, pos)
+            pos += 21
+            members[data[pos:pos + name_size].decode('utf-8', 'surrogateescape')] = (offset, size, member_type)
+            pos += name_size
+        return cls(archive_size, archive_mtime_ns, points, members)
+    
+    @classmethod
+    def load_for(cls, archive):
+        """Load the saved index of an archive, or None if it is missing or out of date"""
+        try:
+            index = cls.load(cls.path_for(archive))
+            stat = os.stat(archive)
+        except (OSError, ValueError, struct.error):
+            return None
+        if (index.archive_size, index.archive_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return index
+
+
 class CompressionEngine:
     """Compression and decompression engine"""
     
     SUPPORTED_FORMATS = {
-        'compress': ['.zip', '.tar.gz', '.tar.bz2', '.tar.xz', '.7z'],
+        'compress': ['.zip', '.tar', '.tar.gz', '.tar.bz2', '.tar.xz', '.7z'],
         'decompress': ['.zip', '.rar', '.7z', '.tar', '.tar.gz', '.tar.bz2', '.tar.xz', '.tgz']
     }
     
-    def __init__(self, progress_callback=None):
-        self.stats = {'files': 0, 'size': 0}
-        self.progress_callback = progress_callback
+    # Members above this size are streamed in chunks on the committing
+    # thread instead of being buffered in memory by a worker.
+    PARALLEL_MEMBER_LIMIT = 4 * 1024 * 1024
     
-    def _update_progress(self, message):
-        if self.progress_callback:
-            self.progress_callback(message)
+    # Most source bytes that members queued for parallel deflate may hold
+    # in memory at once, however many workers there are.
+    PARALLEL_BUFFER_LIMIT = 64 * 1024 * 1024
     
-    def compress(self, source_path, output_file, format_type='zip'):
-        """Compress files or directories"""
-        source = Path(source_path)
+    # Uncompressed bytes of 7z folders decoded per call when extracting in-process
+    SEVEN_ZIP_BATCH_SIZE = 32 * 1024 * 1024
+    
+    # Write buffer for uncompressed tar, where headers are the only small writes
+    TAR_BUFFER_SIZE = 8 * 1024 * 1024
+    
+    # Named speed/ratio trade-offs, mapped to each backend's own level scale
+    COMPRESSION_PROFILES = {
+        'fastest': {'zip': 1, 'gz': 1, 'bz2': 1, 'xz': 0, '7z': 1},
+        'balanced': {'zip': 6, 'gz': 6, 'bz2': 5, 'xz': 3, '7z': 5},
+        'smallest': {'zip': 9, 'gz': 9, 'bz2': 9, 'xz': 9, '7z': 9},
+    }
+    
+    def __init__(self, progress_callback=None, workers=None, listing_cache=None):
         self.stats = {'files': 0, 'size': 0}
+        self.progress = ProgressReporter(progress_callback)
+        self.workers = workers or os.cpu_count() or 1
+        self._duplicates = {}
+        # Paths an extraction created below an existing output directory
+        self._created = None
+        # None uses the default on-disk cache; False disables caching
+        self.listing_cache = ListingCache() if listing_cache is None else listing_cache or None
+    
+    def compress(self, source_path, output_file, format_type='zip', level=None, cancel_token=None,
+                 update=False, verify_crc=False, dedup=False, volume_size=None):
+        """Compress files or directories
+        
+        output_file is a path or any writable binary stream (pipe, socket,
+        stdout); streams are written strictly sequentially. level is either
+        an integer 0-9 or a profile name from COMPRESSION_PROFILES; None
+        keeps each format's default; plain tar ignores it. Setting
+        cancel_token stops the job and deletes the partial archive.
+        
+        With update, an existing ZIP at output_file is refreshed: members
+        whose size and mtime (and CRC, with verify_crc) still match the
+        source are copied over compressed, and only new or changed files
+        are deflated. Files no longer in the source are dropped.
+        
+        With dedup, files whose content repeats an earlier file are stored
+        once: as hard links in tar, and in ZIP (when written to a path) as
+        copies of the first member's compressed bytes.
+        
+        With volume_size (bytes), a ZIP or tar archive is written directly
+        as output_file.001, .002, ... of at most that size each; decompress()
+        reassembles them when given the .001 volume.
+        """
+        source = Path(source_path)
+        self.stats = {'files': 0, 'size': 0, 'stored': 0, 'reused': 0, 'deduplicated': 0}
         
         if not source.exists():
             raise FileNotFoundError(f"Source path not found: {source_path}")
         
-        self._update_progress(f"Starting compression to {format_type.upper()}...")
-        
-        if format_type == 'zip':
-            self._compress_zip(source, output_file)
-        elif format_type in ['tar.gz', 'tgz']:
-            self._compress_tar(source, output_file, 'gz')
-        elif format_type == 'tar.bz2':
-            self._compress_tar(source, output_file, 'bz2')
-        elif format_type == 'tar.xz':
-            self._compress_tar(source, output_file, 'xz')
-        elif format_type == '7z':
-            self._compress_7z(source, output_file)
-        else:
-            raise ValueError(f"Unsupported compression format: {format_type}")
+        self.progress.start('compress', f"Starting compression to {format_type.upper()}...", cancel_token)
+        
+        # Pre-scan so progress can be reported against the total size
+        skipped = []
+        entries = list(_scan_source(source, skipped))
+        self.progress.set_totals(len(entries), sum(entry.stat.st_size for entry in entries))
+        self._duplicates = {}
+        if dedup:
+            self.progress.message("Looking for duplicate files...")
+            self._duplicates = _find_duplicates(entries, self.workers)
         
-        output_size = Path(output_file).stat().st_size
+        streaming = hasattr(output_file, 'write')
+        if streaming:
+            output_file = _CountingWriter(output_file)
+        if update and (format_type != 'zip' or streaming):
+            raise ValueError("Update mode needs a ZIP archive path")
+        # A cancelled update must leave the archive it was refreshing intact
+        keep_output = update and Path(output_file).exists()
+        volumes = None
+        if volume_size:
+            if streaming or update or format_type == '7z':
+                raise ValueError("Split volumes need a ZIP or tar archive written to a path")
+            # From here on the volumes are written like any other output stream
+            volumes = output_file = _VolumeWriter(output_file, volume_size)
+            streaming = True
+        
+        try:
+            if format_type == 'zip':
+                self._compress_zip(entries, output_file, self._resolve_level('zip', level), update, verify_crc)
+            elif format_type == 'tar':
+                self._compress_plain_tar(entries, output_file)
+            elif format_type in ['tar.gz', 'tgz']:
+                self._compress_tar(entries, output_file, 'gz', self._resolve_level('gz', level))
+            elif format_type == 'tar.bz2':
+                self._compress_tar(entries, output_file, 'bz2', self._resolve_level('bz2', level))
+            elif format_type == 'tar.xz':
+                self._compress_tar(entries, output_file, 'xz', self._resolve_level('xz', level))
+            elif format_type == '7z':
+                self._compress_7z(entries, output_file, self._resolve_level('7z', level))
+            else:
+                raise ValueError(f"Unsupported compression format: {format_type}")
+        except OperationCancelled:
+            if volumes is not None:
+                volumes.discard()
+            elif not streaming and not keep_output:
+                Path(output_file).unlink(missing_ok=True)
+            raise
+        finally:
+            if volumes is not None:
+                volumes.close()
+        self.progress.finish()
+        elapsed = self.progress.elapsed
+        
+        if streaming:
+            output_file.flush()
+            output_size = output_file.count
+        else:
+            output_size = Path(output_file).stat().st_size
         compression_ratio = (1 - output_size / self.stats['size']) * 100 if self.stats['size'] > 0 else 0
         
         return {
             'files': self.stats['files'],
             'original_size': self.stats['size'],
             'compressed_size': output_size,
-            'ratio': compression_ratio
+            'ratio': compression_ratio,
+            'stored': self.stats['stored'],
+            'reused': self.stats['reused'],
+            'deduplicated': self.stats['deduplicated'],
+            'volumes': [str(path) for path in volumes.paths] if volumes else [],
+            'skipped': skipped,
+            'elapsed': elapsed,
+            'throughput': self.stats['size'] / elapsed if elapsed > 0 else 0.0
         }
     
-    def decompress(self, archive_path, output_dir=None):
-        """Decompress archive files"""
-        archive = Path(archive_path)
-        self.stats = {'files': 0, 'size': 0}
+    def decompress(self, archive_path, output_dir=None, cancel_token=None, include=None, exclude=None):
+        """Decompress archive files
         
-        if not archive.exists():
-            raise FileNotFoundError(f"Archive not found: {archive_path}")
+        archive_path may also be a readable binary stream (stdin, a pipe or
+        socket) carrying a tar, tar.gz, tar.bz2 or tar.xz archive, which is
+        extracted in a single forward pass; output_dir is then required.
+        Setting cancel_token stops the job and removes what it extracted.
+        include and exclude restrict extraction to member names or glob
+        patterns; tar reading stops as soon as every named file is found.
+        A ZIP or tar archive split into volumes is read from its .001 file.
+        """
+        selection = _MemberFilter(include, exclude)
+        streaming = hasattr(archive_path, 'read')
+        self.stats = {'files': 0, 'size': 0}
+        volumes = None
         
-        if output_dir is None:
-            output_dir = archive.stem
+        if streaming:
+            if output_dir is None:
+                raise ValueError("An output directory is required when extracting from a stream")
+        else:
+            archive = Path(archive_path)
+            if not archive.exists():
+                raise FileNotFoundError(f"Archive not found: {archive_path}")
+            volumes = _volume_paths(archive)
+            if volumes:
+                # Named without its .001, the archive's suffixes give its format
+                archive = archive.with_name(archive.name[:-4])
+            if output_dir is None:
+                output_dir = archive.stem
         
         output_path = Path(output_dir)
+        # A fresh output directory is removed whole on cancel; in an existing
+        # one, the paths each member is about to create are recorded instead
+        self._created = set() if output_path.is_dir() else None
         output_path.mkdir(parents=True, exist_ok=True)
         
-        self._update_progress(f"Starting extraction...")
+        self.progress.start('extract', "Starting extraction...", cancel_token)
+        
+        ext = None if streaming else ''.join(archive.suffixes).lower()
+        if streaming:
+            source = archive_path
+        else:
+            source = _VolumeReader(volumes) if volumes else archive
+        
+        try:
+            if streaming:
+                self._decompress_tar(source, output_path, selection)
+            elif volumes and ext not in ['.zip', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar']:
+                raise ValueError(f"Split volumes are not supported for {ext} archives")
+            elif ext == '.zip':
+                self._decompress_zip(source, output_path, selection)
+            elif ext == '.rar':
+                self._decompress_rar(archive, output_path, selection)
+            elif ext == '.7z':
+                self._decompress_7z(archive, output_path, selection)
+            elif ext in ['.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar']:
+                self._decompress_tar(source, output_path, selection)
+            else:
+                raise ValueError(f"Unsupported archive format: {ext}")
+        except OperationCancelled:
+            self._remove_partial_extraction(output_path)
+            raise
+        finally:
+            if volumes:
+                source.close()
+        self.progress.finish()
+        
+        return {
+            'files': self.stats['files'],
+            'output_path': str(output_path.absolute())
+        }
+    
+    def list_archive(self, archive_path):
+        """List archive members without extracting them
+        
+        ZIP, RAR and 7z are listed from their central index alone; tar
+        formats are read header by header, seeking over member data where
+        the archive is uncompressed. Returns an ArchiveListing, served from
+        the listing cache while the archive is unchanged.
+        """
+        archive = Path(archive_path)
+        if not archive.exists():
+            raise FileNotFoundError(f"Archive not found: {archive_path}")
+        
+        if self.listing_cache is not None:
+            listing = self.listing_cache.get(archive)
+            if listing is not None:
+                return listing
         
         ext = ''.join(archive.suffixes).lower()
+        listing = ArchiveListing()
         
         if ext == '.zip':
-            self._decompress_zip(archive, output_path)
+            self._list_zip(archive, listing)
         elif ext == '.rar':
-            self._decompress_rar(archive, output_path)
+            self._list_rar(archive, listing)
         elif ext == '.7z':
-            self._decompress_7z(archive, output_path)
+            self._list_7z(archive, listing)
         elif ext in ['.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar']:
-            self._decompress_tar(archive, output_path)
+            self._list_tar(archive, listing)
         else:
             raise ValueError(f"Unsupported archive format: {ext}")
         
-        return {
-            'files': self.stats['files'],
-            'output_path': str(output_path.absolute())
-        }
+        if self.listing_cache is not None:
+            self.listing_cache.put(archive, listing)
+        return listing
+    
+    def _list_zip(self, archive, listing):
+        with zipfile.ZipFile(archive, 'r') as zf:
+            for info in zf.infolist():
+                listing.append(info.filename, info.file_size, info.compress_size,
+                               time.mktime(info.date_time + (0, 0, -1)), info.CRC, info.is_dir())
+    
+    def _list_rar(self, archive, listing):
+        if not HAS_RAR:
+            raise ImportError("rarfile not installed. Install with: pip install rarfile")
+        
+        with rarfile.RarFile(archive) as rf:
+            for info in rf.infolist():
+                mtime = time.mktime(info.date_time + (0, 0, -1)) if info.date_time else None
+                listing.append(info.filename, info.file_size, info.compress_size,
+                               mtime, info.CRC, info.is_dir())
+    
+    def _list_7z(self, archive, listing):
+        if not HAS_7Z:
+            raise ImportError("py7zr not installed. Install with: pip install py7zr")
+        
+        with py7zr.SevenZipFile(archive, 'r') as zf:
+            for info in zf.list():
+                mtime = info.creationtime.timestamp() if info.creationtime else None
+                listing.append(info.filename, info.uncompressed, info.compressed,
+                               mtime, info.crc32, info.is_directory)
+    
+    def _list_tar(self, archive, listing):
+        if archive.name.lower().endswith('.tar'):
+            # Uncompressed: seek from header to header without reading any data
+            with tarfile.open(archive, 'r:') as tf:
+                self._list_tar_members(tf, listing)
+            return
+        
+        with open(archive, 'rb') as f, \
+                _open_compressed_stream(f) as reader, \
+                tarfile.open(fileobj=reader, mode='r|') as tf:
+            self._list_tar_members(tf, listing)
+    
+    def _list_tar_members(self, tf, listing):
+        for member in tf:
+            listing.append(member.name, member.size, -1, member.mtime, -1, member.isdir())
+            tf.members.clear()
+    
+    def _note_created(self, output_path, name):
+        """Record the first path a member will create below the output directory"""
+        if self._created is None:
+            return
+        path = output_path
+        for part in name.replace('\\', '/').split('/'):
+            if part in ('', '.', '..'):
+                continue
+            path = path / part
+            # Everything below a path this job created goes with it
+            if path in self._created:
+                return
+            if not os.path.lexists(path):
+                self._created.add(path)
+                return
     
-    def _compress_zip(self, source, output_file):
-        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            if source.is_file():
-                zf.write(source, source.name)
-                self.stats['files'] = 1
-                self.stats['size'] = source.stat().st_size
-                self._update_progress(f"Added: {source.name}")
+    def _remove_partial_extraction(self, output_path):
+        """Delete what a cancelled extraction created, keeping entries that were there before"""
+        if self._created is None:
+            shutil.rmtree(output_path, ignore_errors=True)
+            return
+        for path in self._created:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.lexists(path):
+                os.unlink(path)
+    
+    def _resolve_level(self, backend, level):
+        if level is None:
+            return None
+        if isinstance(level, str):
+            if level not in self.COMPRESSION_PROFILES:
+                raise ValueError(f"Unknown compression profile: {level}")
+            return self.COMPRESSION_PROFILES[level][backend]
+        if not 0 <= level <= 9:
+            raise ValueError(f"Compression level must be between 0 and 9: {level}")
+        # bzip2 has no level 0
+        return max(level, 1) if backend == 'bz2' else level
+    
+    def _compress_zip(self, members, output_file, level=None, update=False, verify_crc=False):
+        if not update or not Path(output_file).exists():
+            self._write_zip(members, output_file, level)
+            return
+        
+        # The refreshed archive is built beside the old one, which it then replaces
+        output_path = Path(output_file)
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        try:
+            with zipfile.ZipFile(output_path, 'r') as previous:
+                self._write_zip(members, tmp_path, level, previous, verify_crc)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    
+    def _write_zip(self, members, output_file, level, previous=None, verify_crc=False):
+        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
+            if self.workers > 1:
+                self._write_zip_parallel(zf, members, previous, verify_crc)
             else:
-                for file_path in source.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(source.parent)
-                        zf.write(file_path, arcname)
-                        self.stats['files'] += 1
-                        self.stats['size'] += file_path.stat().st_size
-                        self._update_progress(f"Adding: {arcname}")
-    
-    def _compress_tar(self, source, output_file, compression):
-        mode_map = {'gz': 'w:gz', 'bz2': 'w:bz2', 'xz': 'w:xz'}
-        mode = mode_map.get(compression, 'w')
-        
-        with tarfile.open(output_file, mode) as tf:
-            if source.is_file():
-                tf.add(source, arcname=source.name)
-                self.stats['files'] = 1
-                self.stats['size'] = source.stat().st_size
-                self._update_progress(f"Added: {source.name}")
+                for entry in members:
+                    reused = self._reusable_zip_member(entry, previous, verify_crc)
+                    if not reused and entry.arcname in self._duplicates and zf._seekable:
+                        reused = self._duplicate_zip_member(zf, entry)
+                    if reused:
+                        _zip_write_raw(zf, *reused)
+                        self._zip_member_added(reused[0])
+                    else:
+                        self._write_zip_member(zf, entry)
+    
+    def _reusable_zip_member(self, entry, previous, verify_crc):
+        """ZipInfo and raw data reader for entry's unchanged member in the previous archive, if any"""
+        if previous is None:
+            return None
+        old = previous.NameToInfo.get(entry.arcname)
+        # Encrypted members cannot be carried over under a fresh local header
+        if old is None or old.flag_bits & 0x1:
+            return None
+        zinfo = _zip_info(entry, old.compress_type)
+        # DOS timestamps only keep even seconds
+        date_time = zinfo.date_time[:5] + (zinfo.date_time[5] // 2 * 2,)
+        if (old.file_size, old.date_time) != (zinfo.file_size, date_time):
+            return None
+        if verify_crc and _file_crc(entry.path) != old.CRC:
+            return None
+        zinfo.CRC = old.CRC
+        zinfo.compress_size = old.compress_size
+        self.stats['reused'] += 1
+        return zinfo, _zip_read_raw(previous, old)
+    
+    def _duplicate_zip_member(self, zf, entry):
+        """ZipInfo and raw data reader copying the already written member with entry's content"""
+        source = zf.NameToInfo[self._duplicates[entry.arcname]]
+        zinfo = _zip_info(entry, source.compress_type)
+        zinfo.CRC = source.CRC
+        zinfo.compress_size = source.compress_size
+        self.stats['deduplicated'] += 1
+        return zinfo, _zip_read_raw(zf, source)
+    
+    def _write_zip_parallel(self, zf, members, previous=None, verify_crc=False):
+        """Deflate members in a thread pool and commit them in source order"""
+        level = zf.compresslevel if zf.compresslevel is not None else zlib.Z_DEFAULT_COMPRESSION
+        # (bytes held, commit) pairs; each commit writes its member once it is the oldest
+        pending = deque()
+        buffered = 0
+        
+        def commit_oldest():
+            nonlocal buffered
+            size, commit = pending.popleft()
+            commit()
+            buffered -= size
+        
+        def commit_raw(job):
+            zinfo, data = job()
+            _zip_write_raw(zf, zinfo, data)
+            self._zip_member_added(zinfo)
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for entry in members:
+                size = 0
+                reused = self._reusable_zip_member(entry, previous, verify_crc)
+                if reused:
+                    # Its bytes are copied when it is committed
+                    commit = functools.partial(commit_raw, lambda reused=reused: reused)
+                elif entry.arcname in self._duplicates and zf._seekable:
+                    # The first copy is ahead of it in the queue, so written by then
+                    commit = functools.partial(commit_raw, functools.partial(self._duplicate_zip_member, zf, entry))
+                elif entry.stat.st_size > self.PARALLEL_MEMBER_LIMIT or _has_stored_extension(entry.arcname):
+                    # Streamed on this thread when its turn comes; stored
+                    # members are then copied inside the kernel where possible
+                    commit = functools.partial(self._write_zip_member, zf, entry)
+                else:
+                    # Deflated data rarely outgrows its source, so the source size is the budget
+                    size = entry.stat.st_size
+                    while pending and buffered + size > self.PARALLEL_BUFFER_LIMIT:
+                        commit_oldest()
+                    commit = functools.partial(commit_raw, pool.submit(_deflate_member, entry, level).result)
+                pending.append((size, commit))
+                buffered += size
+                # Bound the number of members in flight
+                if len(pending) >= self.workers * 2:
+                    commit_oldest()
+            
+            while pending:
+                commit_oldest()
+    
+    def _write_zip_member(self, zf, entry):
+        with open(entry.path, 'rb') as src:
+            sample = src.read(_SAMPLE_SIZE)
+            zinfo = _zip_info(entry, _zip_compression_for(entry.arcname, sample))
+            zinfo._compresslevel = zf.compresslevel
+            if zinfo.compress_type == zipfile.ZIP_STORED and _is_os_file(zf.fp) and _is_os_file(src):
+                self._copy_zip_member(zf, zinfo, src)
+            else:
+                with zf.open(zinfo, 'w') as dest:
+                    for block in itertools.chain((sample,), _read_blocks(src)):
+                        dest.write(block)
+                        self.progress.add_bytes(len(block), entry.arcname)
+        self._zip_member_added(zinfo)
+    
+    def _copy_zip_member(self, zf, zinfo, src):
+        """Store a member whose bytes are copied from src into the archive inside the kernel"""
+        # The local header needs the CRC up front, so one read pass over the
+        # source comes first; the copy itself never enters Python.
+        src.seek(0)
+        crc = 0
+        for block in _read_blocks(src, zinfo.file_size):
+            crc = zlib.crc32(block, crc)
+        zinfo.CRC = crc
+        zinfo.compress_size = zinfo.file_size
+        _zip_begin_raw(zf, zinfo)
+        written = 0
+        for size in _copy_range(src, 0, zf.fp, zinfo.file_size):
+            written += size
+            self.progress.add_bytes(size, zinfo.filename)
+        if written != zinfo.file_size:
+            raise OSError(f"{zinfo.filename} changed size while it was being archived")
+        _zip_end_raw(zf, zinfo)
+    
+    def _progress_blocks(self, blocks, name):
+        for block in blocks:
+            yield block
+            self.progress.add_bytes(len(block), name)
+    
+    def _progress_counts(self, sizes, name):
+        for size in sizes:
+            yield size
+            self.progress.add_bytes(size, name)
+    
+    def _zip_member_added(self, zinfo):
+        if zinfo.compress_type == zipfile.ZIP_STORED:
+            self.stats['stored'] += 1
+        self._member_added(zinfo.filename, zinfo.file_size)
+    
+    def _member_added(self, arcname, size):
+        self.stats['files'] += 1
+        self.stats['size'] += size
+        self.progress.advance(arcname, size)
+    
+    def _compress_tar(self, members, output_file, compression, level=None):
+        # tarfile's own defaults: gzip and bzip2 at 9, xz at preset 6
+        if level is None:
+            level = 6 if compression == 'xz' else 9
+        
+        if self.workers > 1:
+            writers = {
+                'gz': lambda f: _ParallelGzipWriter(f, level, self.workers),
+                'xz': lambda f: _ParallelXzWriter(f, level, self.workers),
+                'bz2': lambda f: _ParallelBz2Writer(f, level, self.workers),
+            }
+        else:
+            writers = {
+                'gz': lambda f: gzip.GzipFile(fileobj=f, mode='wb', compresslevel=level),
+                'xz': lambda f: lzma.LZMAFile(f, 'wb', preset=level),
+                'bz2': lambda f: bz2.BZ2File(f, 'wb', compresslevel=level),
+            }
+        
+        # Every backend only appends to its output and tracks its own
+        # position, so the same pipeline serves regular files as well as
+        # pipes and sockets. Plain 'w' mode writes straight to the backend;
+        # 'w|' would copy everything once more through tarfile's own buffer.
+        with _open_output(output_file) as f, \
+                writers[compression](f) as writer, \
+                tarfile.open(fileobj=writer, mode='w') as tf:
+            self._add_tar_members(tf, members)
+    
+    def _compress_plain_tar(self, members, output_file):
+        # Written to a path, member data is copied into the archive inside
+        # the kernel; a stream still gets large writes from the buffer.
+        if hasattr(output_file, 'write'):
+            writer = _WriteBuffer(output_file, self.TAR_BUFFER_SIZE)
+        else:
+            writer = open(output_file, 'wb', buffering=self.TAR_BUFFER_SIZE)
+        with writer, tarfile.open(fileobj=writer, mode='w') as tf:
+            self._add_tar_members(tf, members)
+    
+    def _add_tar_members(self, tf, members):
+        for entry in members:
+            tarinfo = _tar_info(tf, entry)
+            if tarinfo.isreg() and entry.arcname in self._duplicates:
+                # Same content as an earlier member: link to it instead of storing it again
+                tarinfo.type = tarfile.LNKTYPE
+                tarinfo.linkname = self._duplicates[entry.arcname]
+                tarinfo.size = 0
+                self.stats['deduplicated'] += 1
+            if tarinfo.isreg():
+                with open(entry.path, 'rb') as f:
+                    if _is_os_file(tf.fileobj):
+                        # Uncompressed output: the payload can stay inside the kernel
+                        _tar_write_header(tf, tarinfo)
+                        written = sum(self._progress_counts(
+                            _copy_range(f, 0, tf.fileobj, tarinfo.size), entry.arcname))
+                        _tar_end_member(tf, tarinfo, written)
+                    else:
+                        _tar_write_member(tf, tarinfo, self._progress_blocks(
+                            _read_blocks(f, tarinfo.size), entry.arcname))
             else:
-                for file_path in source.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(source.parent)
-                        tf.add(file_path, arcname=arcname)
-                        self.stats['files'] += 1
-                        self.stats['size'] += file_path.stat().st_size
-                        self._update_progress(f"Adding: {arcname}")
-    
-    def _compress_7z(self, source, output_file):
+                tf.addfile(tarinfo)
+            self._member_added(entry.arcname, entry.stat.st_size)
+    
+    def _compress_7z(self, members, output_file, level=None):
         if not HAS_7Z:
             raise ImportError("py7zr not installed. Install with: pip install py7zr")
+        if hasattr(output_file, 'write'):
+            raise ValueError("7z archives need a seekable output file and cannot be streamed")
         
-        with py7zr.SevenZipFile(output_file, 'w') as zf:
-            if source.is_file():
-                zf.write(source, source.name)
-                self.stats['files'] = 1
-                self.stats['size'] = source.stat().st_size
-                self._update_progress(f"Added: {source.name}")
-            else:
-                for file_path in source.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(source.parent)
-                        zf.write(file_path, arcname)
-                        self.stats['files'] += 1
-                        self.stats['size'] += file_path.stat().st_size
-                        self._update_progress(f"Adding: {arcname}")
-    
-    def _decompress_zip(self, archive, output_path):
+        options = {}
+        if level is not None:
+            options['filters'] = [{'id': py7zr.FILTER_LZMA2, 'preset': level}]
+        
+        with py7zr.SevenZipFile(output_file, 'w', **options) as zf:
+            for entry in members:
+                zf.write(entry.path, entry.arcname)
+                self._member_added(entry.arcname, entry.stat.st_size)
+    
+    def _decompress_zip(self, archive, output_path, selection):
+        # Only the central directory is read; unselected members are never inflated
         with zipfile.ZipFile(archive, 'r') as zf:
-            members = zf.namelist()
+            members = [member for member in zf.infolist()
+                       if selection.matches(member.filename, member.is_dir())]
             self.stats['files'] = len(members)
             for member in members:
-                self._update_progress(f"Extracting: {member}")
-                zf.extract(member, output_path)
+                self._note_created(output_path, member.filename)
+            self.progress.set_totals(len(members), sum(member.file_size for member in members))
+            if self.workers > 1 and len(members) > 1:
+                self._extract_zip_parallel(archive, members, output_path)
+                return
+            for member in members:
+                self._extract_zip_member(zf, member, output_path)
+                self.progress.advance(member.filename, member.file_size)
+    
+    def _extract_zip_member(self, zf, member, output_path):
+        stored = member.compress_type == zipfile.ZIP_STORED and not member.flag_bits & 0x1
+        if not stored or member.is_dir() or not _is_os_file(zf.fp):
+            zf.extract(member, output_path)
+            return
+        # Stored data is copied out inside the kernel and its CRC checked in place
+        target = _zip_target_path(member, output_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w+b') as dest:
+            copied = sum(_copy_range(zf.fp, _zip_data_offset(zf.fp, member), dest, member.file_size))
+            if copied != member.file_size:
+                raise zipfile.BadZipFile(f"Truncated data for {member.filename}")
+            dest.seek(0)
+            crc = 0
+            for block in _read_blocks(dest):
+                crc = zlib.crc32(block, crc)
+        if crc != member.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {member.filename!r}")
     
-    def _decompress_rar(self, archive, output_path):
+    def _extract_zip_parallel(self, archive, members, output_path):
+        """Extract members concurrently, each worker thread using its own archive handle"""
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+        
+        def extract(member):
+            self.progress.check_cancelled()
+            zf = getattr(local, 'zf', None)
+            if zf is None:
+                # Volume readers keep a position, so every thread needs its own
+                source = archive.reopen() if isinstance(archive, _VolumeReader) else archive
+                zf = local.zf = zipfile.ZipFile(source, 'r')
+                with handles_lock:
+                    handles.append((zf, source))
+            try:
+                self._extract_zip_member(zf, member, output_path)
+            except FileExistsError:
+                # Another worker created the same parent directory first
+                self._extract_zip_member(zf, member, output_path)
+            return member
+        
+        # Largest members first so the tail of the job is spread across workers
+        members = sorted(members, key=lambda m: m.file_size, reverse=True)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for member in pool.map(extract, members):
+                self.progress.advance(member.filename, member.file_size)
+        finally:
+            # Drop queued members at once if the job was cancelled or failed
+            pool.shutdown(cancel_futures=True)
+            for zf, source in handles:
+                zf.close()
+                if source is not archive:
+                    source.close()
+    
+    def _decompress_rar(self, archive, output_path, selection):
         if not HAS_RAR:
             raise ImportError("rarfile not installed. Install with: pip install rarfile")
         
         with rarfile.RarFile(archive) as rf:
-            members = rf.namelist()
+            members = [member for member in rf.infolist()
+                       if selection.matches(member.filename, member.is_dir())]
             self.stats['files'] = len(members)
             for member in members:
-                self._update_progress(f"Extracting: {member}")
+                self._note_created(output_path, member.filename)
+            self.progress.set_totals(len(members), sum(member.file_size for member in members))
+            for member in members:
                 rf.extract(member, output_path)
+                self.progress.advance(member.filename, member.file_size)
     
-    def _decompress_7z(self, archive, output_path):
+    def _decompress_7z(self, archive, output_path, selection):
         if not HAS_7Z:
             raise ImportError("py7zr not installed. Install with: pip install py7zr")
         
+        # Solid folders holding no selected member are skipped without decoding
         with py7zr.SevenZipFile(archive, 'r') as zf:
-            members = zf.getnames()
+            members = [member for member in zf.files
+                       if selection.matches(member.filename, member.is_directory)]
             self.stats['files'] = len(members)
-            zf.extractall(output_path)
             for member in members:
-                self._update_progress(f"Extracting: {member}")
-    
-    def _decompress_tar(self, archive, output_path):
-        with tarfile.open(archive, 'r:*') as tf:
-            members = tf.getmembers()
-            self.stats['files'] = len(members)
+                self._note_created(output_path, member.filename)
+            self.progress.set_totals(len(members), sum(member.uncompressed or 0 for member in members))
+            
+            # Each solid folder is an independent compressed stream
+            folders = {}
             for member in members:
-                self._update_progress(f"Extracting: {member.name}")
-                tf.extract(member, output_path)
+                if member.folder is not None:
+                    folders.setdefault(id(member.folder), []).append(member)
+            
+            # Directories and empty files carry no data and are created up front
+            loose = [member for member in members if member.folder is None]
+            if loose:
+                zf.extract(output_path, targets=[member.filename for member in loose])
+                for member in loose:
+                    self.progress.advance(member.filename)
+            
+            if self.workers <= 1 or len(folders) < 2:
+                # A few folders per call, so a cancelled job stops at the next
+                # batch instead of decoding the whole archive first. py7zr's
+                # progress callback cannot serve here: every call given one
+                # starts a reporter thread, and close() only stops the last.
+                for batch in _seven_zip_batches(folders.values(), self.SEVEN_ZIP_BATCH_SIZE):
+                    self.progress.check_cancelled()
+                    zf.reset()
+                    zf.extract(output_path, targets=[member.filename for member in batch])
+                    for member in batch:
+                        self.progress.advance(member.filename, member.uncompressed or 0)
+                return
+        
+        self._extract_7z_parallel(archive, list(folders.values()), output_path)
+    
+    def _extract_7z_parallel(self, archive, folders, output_path):
+        """Extract independent solid folders concurrently in worker processes"""
+        # Largest folders first so the tail of the job is spread across workers
+        folders.sort(key=lambda group: sum(member.uncompressed or 0 for member in group), reverse=True)
+        # Unlike ProcessPoolExecutor, a multiprocessing pool can be terminated
+        # with folders still being decoded, so cancelling takes effect at once
+        pool = multiprocessing.get_context('spawn').Pool(min(self.workers, len(folders)))
+        try:
+            pending = [
+                (pool.apply_async(_extract_7z_folder, (str(archive), [member.filename for member in group],
+                                                       str(output_path))), group)
+                for group in folders
+            ]
+            while pending:
+                self.progress.check_cancelled()
+                # Wait in short slices so the cancel token is polled meanwhile
+                pending[0][0].wait(0.1)
+                running = []
+                for result, group in pending:
+                    if not result.ready():
+                        running.append((result, group))
+                        continue
+                    result.get()
+                    for member in group:
+                        self.progress.advance(member.filename, member.uncompressed or 0)
+                pending = running
+        finally:
+            # Stops folders still running if the job was cancelled or failed
+            pool.terminate()
+            pool.join()
+    
+    def build_seek_index(self, archive_path, span=None):
+        """Index a .tar.gz for random access and save the index next to it
+        
+        One pass over the archive records an access point about every span
+        bytes of tar data (GzipSeekIndex.SPAN by default) plus the offset of
+        every member. decompress() then uses the index whenever include
+        names specific files, inflating only from the nearest access point.
+        """
+        archive = Path(archive_path)
+        if not archive.name.lower().endswith(('.tar.gz', '.tgz')):
+            raise ValueError("Seek indexes are only supported for .tar.gz archives")
+        stat = archive.stat()
+        
+        members = {}
+        listing = ArchiveListing()
+        with open(archive, 'rb') as f:
+            reader = _GzipSeekReader(f, span=span or GzipSeekIndex.SPAN)
+            with tarfile.open(fileobj=reader, mode='r|') as tf:
+                for member in tf:
+                    # A later copy of a name replaces the earlier one, as on extraction
+                    members[_member_name(member.name)] = (member.offset, member.size, member.type[0])
+                    listing.append(member.name, member.size, -1, member.mtime, -1, member.isdir())
+                    tf.members.clear()
+        
+        index = GzipSeekIndex(stat.st_size, stat.st_mtime_ns, reader.points, members)
+        index.save(GzipSeekIndex.path_for(archive))
+        # The pass read every header anyway, so the listing comes for free
+        if self.listing_cache is not None:
+            self.listing_cache.put(archive, listing)
+        return index
+    
+    def _decompress_tar(self, archive, output_path, selection):
+        if isinstance(archive, Path) and selection.active and self.listing_cache is not None:
+            # Knowing every member name up front lets patterns stop reading early too
+            listing = self.listing_cache.get(archive)
+            if listing is not None:
+                selection.narrow(listing)
+        
+        if isinstance(archive, Path) and selection.pending and archive.name.lower().endswith(('.tar.gz', '.tgz')):
+            index = GzipSeekIndex.load_for(archive)
+            if index is not None and self._extract_tar_indexed(archive, index, output_path, selection):
+                return
+        
+        if (isinstance(archive, Path) and archive.name.lower().endswith('.tar.bz2') and self.workers > 1
+                and _ParallelBz2Reader.is_multistream(archive)):
+            with _ParallelBz2Reader(archive, self.workers) as reader, \
+                    tarfile.open(fileobj=reader, mode='r|') as tf:
+                self._extract_tar_stream(tf, output_path, selection)
+            return
+        
+        # Stream mode decompresses the archive exactly once, whereas
+        # getmembers() followed by extract() would inflate it twice.
+        with _open_input(archive) as f, \
+                _open_compressed_stream(f) as reader, \
+                tarfile.open(fileobj=reader, mode='r|') as tf:
+            self._extract_tar_stream(tf, output_path, selection)
+    
+    def _extract_tar_indexed(self, archive, index, output_path, selection):
+        """Extract explicitly named files by inflating from the nearest access point"""
+        wanted = []
+        for name in selection.pending:
+            member = index.members.get(name)
+            # Directories need their children and hard links their target; scan for those
+            if member is None or member[2] in (tarfile.DIRTYPE[0], tarfile.LNKTYPE[0]):
+                return False
+            wanted.append((member[0], name))
+        
+        with open(archive, 'rb') as f:
+            for offset, name in sorted(wanted):
+                reader = _GzipSeekReader(f, index.point_before(offset))
+                reader.skip_to(offset)
+                with tarfile.open(fileobj=reader, mode='r|') as tf:
+                    self._extract_tar_stream(tf, output_path, _MemberFilter([name], selection.exclude))
+        return True
+    
+    def _extract_tar_stream(self, tf, output_path, selection):
+        """Extract each member as it is read, in one forward pass over the archive"""
+        for member in tf:
+            wanted = selection.matches(member.name, member.isdir())
+            if wanted and member.islnk() and selection.active:
+                # A hard link's data lives with its target; skip it if that was filtered out
+                wanted = os.path.lexists(os.path.join(output_path, member.linkname))
+            if wanted:
+                self.stats['files'] += 1
+                self._extract_tar_member(tf, member, output_path)
+                self.progress.advance(member.name, member.size)
+            else:
+                self.progress.check_cancelled()
+            # TarFile keeps every TarInfo it reads; only counters are needed here
+            tf.members.clear()
+            if selection.complete:
+                break
+    
+    def _extract_tar_member(self, tf, member, output_path):
+        self._note_created(output_path, member.name)
+        if member.islnk():
+            # tarfile cannot link over an existing file, and in stream mode its
+            # fallback of re-reading the link target's data is not possible
+            target = os.path.join(output_path, member.name)
+            if os.path.lexists(target) and not os.path.isdir(target):
+                os.unlink(target)
+        tf.extract(member, output_path)
     
     @staticmethod
     def format_size(size):
@@ -223,6 +2535,9 @@ class YUSRLinRZGUI:
         self.root.minsize(800, 500)
         
         self.engine = CompressionEngine(self.update_progress)
+        self._latest_progress = None
+        self._progress_scheduled = False
+        self.cancel_token = None
         self.current_dir = os.path.expanduser("~")
         
         self.setup_ui()
@@ -239,6 +2554,7 @@ class YUSRLinRZGUI:
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Add to Archive...", command=self.compress_dialog)
         file_menu.add_command(label="Extract Archive...", command=self.extract_dialog)
+        file_menu.add_command(label="View Contents...", command=self.contents_dialog)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
@@ -252,6 +2568,7 @@ class YUSRLinRZGUI:
         
         ttk.Button(toolbar, text="Add", command=self.compress_dialog, width=10).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Extract", command=self.extract_dialog, width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Contents", command=self.contents_dialog, width=10).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Test", command=self.test_archive, width=10).pack(side=tk.LEFT, padx=2)
         
         ttk.Separator(toolbar, orient=tk.VERTICAL).pack(side=tk.LEFT, padx=5, fill=tk.Y)
@@ -315,6 +2632,13 @@ class YUSRLinRZGUI:
         self.progress_label = ttk.Label(progress_frame, textvariable=self.progress_var, anchor=tk.W)
         self.progress_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.cancel_job,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=2)
+        
+        self.progress_bar = ttk.Progressbar(progress_frame, length=200, mode='determinate', maximum=100)
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+        
         # Status bar
         status_frame = ttk.Frame(self.root, relief=tk.SUNKEN, padding="2")
         status_frame.pack(side=tk.BOTTOM, fill=tk.X)
@@ -421,7 +2745,7 @@ class YUSRLinRZGUI:
         """Show compress dialog"""
         dialog = tk.Toplevel(self.root)
         dialog.title("Add to Archive")
-        dialog.geometry("500x300")
+        dialog.geometry("500x470")
         dialog.transient(self.root)
         dialog.grab_set()
         
@@ -451,10 +2775,29 @@ class YUSRLinRZGUI:
         ttk.Label(output_frame, text="Format:").pack(anchor=tk.W, pady=2)
         format_var = tk.StringVar(value="zip")
         format_combo = ttk.Combobox(output_frame, textvariable=format_var, 
-                                    values=['zip', 'tar.gz', 'tar.bz2', 'tar.xz', '7z'],
+                                    values=['zip', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz', '7z'],
                                     state='readonly')
         format_combo.pack(fill=tk.X, pady=5)
         
+        ttk.Label(output_frame, text="Compression:").pack(anchor=tk.W, pady=2)
+        level_var = tk.StringVar(value="default")
+        level_combo = ttk.Combobox(output_frame, textvariable=level_var,
+                                   values=['default'] + list(CompressionEngine.COMPRESSION_PROFILES),
+                                   state='readonly')
+        level_combo.pack(fill=tk.X, pady=5)
+        
+        update_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(output_frame, text="Update existing ZIP (only recompress changed files)",
+                        variable=update_var).pack(anchor=tk.W, pady=2)
+        
+        dedup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(output_frame, text="Store duplicate files only once",
+                        variable=dedup_var).pack(anchor=tk.W, pady=2)
+        
+        ttk.Label(output_frame, text="Split into volumes of (MB, empty for a single file):").pack(anchor=tk.W, pady=2)
+        volume_var = tk.StringVar(value="")
+        ttk.Entry(output_frame, textvariable=volume_var).pack(fill=tk.X, pady=5)
+        
         # Buttons
         button_frame = ttk.Frame(dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -463,13 +2806,21 @@ class YUSRLinRZGUI:
             source = source_var.get()
             output = output_var.get()
             fmt = format_var.get()
+            level = level_var.get()
             
             if not source or not output:
                 messagebox.showerror("Error", "Please select source and output")
                 return
+            try:
+                volume_mb = float(volume_var.get()) if volume_var.get().strip() else 0
+            except ValueError:
+                messagebox.showerror("Error", "Volume size must be a number of megabytes")
+                return
             
             dialog.destroy()
-            self.compress_files(source, output, fmt)
+            self.compress_files(source, output, fmt, None if level == 'default' else level,
+                                update_var.get() and fmt == 'zip', dedup_var.get(),
+                                int(volume_mb * 1024 * 1024) or None)
         
         ttk.Button(button_frame, text="OK", command=do_compress).pack(side=tk.RIGHT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT)
@@ -484,6 +2835,7 @@ class YUSRLinRZGUI:
                 ("RAR files", "*.rar"),
                 ("7Z files", "*.7z"),
                 ("TAR files", "*.tar;*.tar.gz;*.tar.bz2;*.tar.xz;*.tgz"),
+                ("Split volumes", "*.001"),
                 ("All files", "*.*")
             ]
         )
@@ -494,6 +2846,93 @@ class YUSRLinRZGUI:
             if output_dir:
                 self.extract_archive(archive_path, output_dir)
     
+    def contents_dialog(self):
+        """List the selected archive, or one chosen from a file dialog"""
+        archive_path = None
+        selection = self.file_tree.selection()
+        if selection:
+            item = self.file_tree.item(selection[0])
+            name = item['text'].split(' ', 1)[1] if ' ' in item['text'] else item['text']
+            item_type = item['values'][2] if item['values'] else ''
+            if str(item_type).lower() in ['zip', 'rar', '7z', 'tar', 'gz', 'bz2', 'xz', 'tgz']:
+                archive_path = str(Path(self.current_dir) / name)
+        if archive_path is None:
+            archive_path = filedialog.askopenfilename(
+                title="Select Archive",
+                filetypes=[
+                    ("All Archives", "*.zip;*.rar;*.7z;*.tar;*.tar.gz;*.tar.bz2;*.tar.xz;*.tgz"),
+                    ("All files", "*.*")
+                ]
+            )
+        if archive_path:
+            self.list_contents(archive_path)
+    
+    def list_contents(self, archive_path):
+        """Read an archive listing in a background thread"""
+        # Listing is not a cancellable job, so a compress or extract running
+        # meanwhile keeps its Cancel button and only this status text is touched
+        status = f"Reading {Path(archive_path).name}..."
+        self.progress_var.set(status)
+        
+        def restore_status():
+            if self.progress_var.get() == status:
+                self.progress_var.set("Ready")
+        
+        def task():
+            try:
+                listing = self.engine.list_archive(archive_path)
+                self.root.after(0, lambda: self.show_contents(archive_path, listing))
+            except Exception as e:
+                self.root.after(0, lambda msg=str(e): messagebox.showerror("Error", msg))
+            finally:
+                self.root.after(0, restore_status)
+        
+        threading.Thread(target=task, daemon=True).start()
+    
+    def show_contents(self, archive_path, listing):
+        """Show an archive listing in its own window"""
+        window = tk.Toplevel(self.root)
+        window.title(f"Contents of {Path(archive_path).name}")
+        window.geometry("700x450")
+        
+        ttk.Label(window, text=f"{len(listing)} entries, {self.engine.format_size(listing.total_size)}",
+                  padding="5").pack(side=tk.BOTTOM, fill=tk.X)
+        
+        frame = ttk.Frame(window, padding="5")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        scroll_y = ttk.Scrollbar(frame)
+        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        tree = ttk.Treeview(frame, columns=('Size', 'Packed', 'Modified'), yscrollcommand=scroll_y.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll_y.config(command=tree.yview)
+        
+        tree.heading('#0', text='Name', anchor=tk.W)
+        tree.heading('Size', text='Size', anchor=tk.E)
+        tree.heading('Packed', text='Packed', anchor=tk.E)
+        tree.heading('Modified', text='Modified', anchor=tk.W)
+        tree.column('#0', width=330, minwidth=150)
+        tree.column('Size', width=100, minwidth=80, anchor=tk.E)
+        tree.column('Packed', width=100, minwidth=80, anchor=tk.E)
+        tree.column('Modified', width=140, minwidth=120)
+        
+        # Rows go in a batch per event loop turn so huge listings keep the UI responsive
+        def insert_rows(start=0):
+            if not tree.winfo_exists():
+                return
+            end = min(start + 2000, len(listing))
+            for index in range(start, end):
+                entry = listing[index]
+                packed = self.engine.format_size(entry.compressed_size) if entry.compressed_size >= 0 else ''
+                modified = datetime.fromtimestamp(entry.mtime).strftime('%Y-%m-%d %H:%M') if entry.mtime >= 0 else ''
+                tree.insert('', tk.END, text=entry.name,
+                            values=('' if entry.is_dir else self.engine.format_size(entry.size), packed, modified))
+            if end < len(listing):
+                tree.after(1, insert_rows, end)
+        
+        insert_rows()
+        
     def select_file(self, var):
         """Select file for compression"""
         filename = filedialog.askopenfilename(initialdir=self.current_dir)
@@ -506,30 +2945,59 @@ class YUSRLinRZGUI:
         if folder:
             var.set(folder)
     
-    def compress_files(self, source, output, format_type):
+    def compress_files(self, source, output, format_type, level=None, update=False, dedup=False,
+                       volume_size=None):
         """Compress files in background thread"""
+        token = self.start_job()
+        
         def task():
             try:
-                result = self.engine.compress(source, output, format_type)
+                result = self.engine.compress(source, output, format_type, level, token,
+                                              update=update, dedup=dedup, volume_size=volume_size)
                 self.root.after(0, lambda: self.compression_complete(result, output))
+            except OperationCancelled:
+                self.root.after(0, lambda: self.end_job("Compression cancelled"))
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
-                self.root.after(0, lambda: self.progress_var.set("Ready"))
+                self.root.after(0, lambda msg=str(e): messagebox.showerror("Error", msg))
+                self.root.after(0, self.end_job)
         
         threading.Thread(target=task, daemon=True).start()
     
     def extract_archive(self, archive_path, output_dir=None):
         """Extract archive in background thread"""
+        token = self.start_job()
+        
         def task():
             try:
-                result = self.engine.decompress(archive_path, output_dir)
+                result = self.engine.decompress(archive_path, output_dir, token)
                 self.root.after(0, lambda: self.extraction_complete(result))
+            except OperationCancelled:
+                self.root.after(0, lambda: self.end_job("Extraction cancelled"))
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
-                self.root.after(0, lambda: self.progress_var.set("Ready"))
+                self.root.after(0, lambda msg=str(e): messagebox.showerror("Error", msg))
+                self.root.after(0, self.end_job)
         
         threading.Thread(target=task, daemon=True).start()
     
+    def start_job(self):
+        """Enable cancelling and return the token for a new background job"""
+        self.cancel_token = CancelToken()
+        self.cancel_button.config(state=tk.NORMAL)
+        return self.cancel_token
+    
+    def end_job(self, message="Ready"):
+        """Reset progress widgets once a background job has stopped"""
+        self.cancel_token = None
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_var.set(message)
+        self.progress_bar['value'] = 0
+    
+    def cancel_job(self):
+        """Ask the running background job to stop"""
+        if self.cancel_token:
+            self.cancel_token.cancel()
+            self.progress_var.set("Cancelling...")
+    
     def compression_complete(self, result, output):
         """Handle compression completion"""
         msg = f"Compression complete!\n\n"
@@ -537,10 +3005,21 @@ class YUSRLinRZGUI:
         msg += f"Original size: {self.engine.format_size(result['original_size'])}\n"
         msg += f"Compressed size: {self.engine.format_size(result['compressed_size'])}\n"
         msg += f"Compression ratio: {result['ratio']:.1f}%\n"
+        msg += f"Throughput: {self.engine.format_size(result['throughput'])}/s\n"
+        if result['stored']:
+            msg += f"Stored without compression: {result['stored']} files\n"
+        if result['reused']:
+            msg += f"Unchanged, copied from previous archive: {result['reused']} files\n"
+        if result['deduplicated']:
+            msg += f"Duplicates stored once: {result['deduplicated']} files\n"
+        if result['volumes']:
+            msg += f"Split into {len(result['volumes'])} volumes\n"
+        if result['skipped']:
+            msg += f"Unreadable folders skipped: {len(result['skipped'])}\n"
         msg += f"\nArchive saved to:\n{output}"
         
         messagebox.showinfo("Success", msg)
-        self.progress_var.set("Ready")
+        self.end_job()
         self.refresh_file_list()
     
     def extraction_complete(self, result):
@@ -550,16 +3029,27 @@ class YUSRLinRZGUI:
         msg += f"Output directory:\n{result['output_path']}"
         
         messagebox.showinfo("Success", msg)
-        self.progress_var.set("Ready")
+        self.end_job()
         self.refresh_file_list()
     
     def test_archive(self):
         """Test selected archive"""
         messagebox.showinfo("Test", "Archive testing feature coming soon!")
     
-    def update_progress(self, message):
+    def update_progress(self, event):
         """Update progress message"""
-        self.root.after(0, lambda: self.progress_var.set(message))
+        # Latest wins: at most one Tk callback is queued however often the
+        # engine reports, and it shows whatever event is newest when it runs.
+        self._latest_progress = event
+        if not self._progress_scheduled:
+            self._progress_scheduled = True
+            self.root.after(0, self._show_progress)
+    
+    def _show_progress(self):
+        self._progress_scheduled = False
+        event = self._latest_progress
+        self.progress_var.set(str(event))
+        self.progress_bar['value'] = (event.fraction or 0) * 100
     
     def show_about(self):
         """Show about dialog"""
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import linrz
+from linrz import CancelToken, CompressionEngine, OperationCancelled
+
+
+@unittest.skipUnless(linrz.HAS_7Z, "py7zr not installed")
+class SevenZipExtractionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        (source / 'a').mkdir(parents=True)
+        for i in range(3):
+            (source / 'a' / f'f{i}.bin').write_bytes(os.urandom(50 * 1024))
+            (source / f'g{i}.txt').write_bytes(b'line\n' * 2000 * (i + 1))
+        self.source = source
+        self.archive = self.root / 'archive.7z'
+        CompressionEngine(workers=1, listing_cache=False).compress(source, self.archive, '7z')
+        # Appending adds a second solid folder, which the parallel path extracts separately
+        with linrz.py7zr.SevenZipFile(self.archive, 'a') as zf:
+            zf.write(source / 'g0.txt', 'extra/g0.txt')
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _extracted(self, output):
+        return sorted(str(path.relative_to(output)) for path in output.rglob('*') if path.is_file())
+    
+    def test_extract_all(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                output = self.root / f'all-{workers}'
+                engine = CompressionEngine(workers=workers, listing_cache=False)
+                engine.decompress(self.archive, output)
+                self.assertEqual(len(self._extracted(output)), 7)
+                self.assertEqual(engine.progress.files, 7)
+                self.assertEqual((output / 'src' / 'a' / 'f1.bin').read_bytes(),
+                                 (self.source / 'a' / 'f1.bin').read_bytes())
+    
+    def test_extract_selected(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                output = self.root / f'selected-{workers}'
+                engine = CompressionEngine(workers=workers, listing_cache=False)
+                engine.decompress(self.archive, output, include=['src/g2.txt', 'extra/*'])
+                self.assertEqual(self._extracted(output), ['extra/g0.txt', 'src/g2.txt'])
+                self.assertEqual(engine.progress.files, 2)
+    
+    def test_cancel_stops_between_folders(self):
+        # Each append adds another solid folder
+        for i in range(4):
+            with linrz.py7zr.SevenZipFile(self.archive, 'a') as zf:
+                zf.write(self.source / 'g2.txt', f'more/{i}.txt')
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                output = self.root / f'cancelled-{workers}'
+                token = CancelToken()
+                engine = CompressionEngine(lambda event: token.cancel(), workers=workers, listing_cache=False)
+                engine.progress.interval = 0
+                with self.assertRaises(OperationCancelled):
+                    engine.decompress(self.archive, output, cancel_token=token)
+                self.assertFalse(output.exists())
+                self.assertLess(engine.progress.files, 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from linrz import CancelToken, CompressionEngine, OperationCancelled
+
+
+class CancelledExtractionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        (source / 'a').mkdir(parents=True)
+        for i in range(40):
+            (source / 'a' / f'f{i}.txt').write_bytes(os.urandom(4096))
+        self.source = source
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _output_with_existing_tree(self, name):
+        output = self.root / name
+        (output / 'src' / 'a').mkdir(parents=True)
+        (output / 'src' / 'keep.txt').write_text('keep')
+        (output / 'src' / 'a' / 'old.txt').write_text('old')
+        return output
+    
+    def test_cancel_removes_files_below_existing_directories(self):
+        for fmt in ('zip', 'tar.gz'):
+            for workers in (1, 2):
+                with self.subTest(fmt=fmt, workers=workers):
+                    archive = self.root / f'archive.{fmt}'
+                    CompressionEngine(workers=workers, listing_cache=False).compress(self.source, archive, fmt)
+                    output = self._output_with_existing_tree(f'out-{fmt}-{workers}')
+                    token = CancelToken()
+                    
+                    def cancel_midway(event):
+                        if event.files >= 5:
+                            token.cancel()
+                    
+                    engine = CompressionEngine(cancel_midway, workers=workers, listing_cache=False)
+                    # Publish every event so the cancel lands part way through
+                    engine.progress.interval = 0
+                    with self.assertRaises(OperationCancelled):
+                        engine.decompress(archive, output, cancel_token=token)
+                    remaining = sorted(str(path.relative_to(output)) for path in output.rglob('*'))
+                    self.assertEqual(remaining, ['src', 'src/a', 'src/a/old.txt', 'src/keep.txt'])
+                    self.assertEqual((output / 'src' / 'keep.txt').read_text(), 'keep')
+
+
+if __name__ == '__main__':
+    unittest.main()
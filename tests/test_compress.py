@@ -0,0 +1,193 @@
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import linrz
+from linrz import CancelToken, CompressionEngine, OperationCancelled
+
+
+class UnreadableDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        (source / 'locked').mkdir(parents=True)
+        (source / 'locked' / 'secret.txt').write_bytes(b'hidden\n')
+        (source / 'a.txt').write_bytes(b'hello\n' * 100)
+        self.source = source
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def test_unreadable_directory_is_skipped_and_reported(self):
+        # chmod does not stop root, so refuse the directory at the scandir call
+        locked = str(self.source / 'locked')
+        scandir = os.scandir
+        
+        def guarded_scandir(path):
+            if os.fspath(path) == locked:
+                raise PermissionError(13, 'Permission denied', locked)
+            return scandir(path)
+        
+        engine = CompressionEngine(listing_cache=False)
+        output = self.root / 'out.zip'
+        with mock.patch.object(linrz.os, 'scandir', guarded_scandir):
+            result = engine.compress(str(self.source), str(output), 'zip')
+        
+        self.assertEqual(result['skipped'], [locked])
+        self.assertEqual(result['files'], 1)
+        with zipfile.ZipFile(output) as zf:
+            self.assertEqual(zf.namelist(), ['src/a.txt'])
+
+
+
+class ZipUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        source.mkdir()
+        for i in range(6):
+            (source / f'f{i}.txt').write_bytes(f'file {i}\n'.encode() * 2000)
+        self.source = source
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _contents(self, archive):
+        with zipfile.ZipFile(archive) as zf:
+            self.assertIsNone(zf.testzip())
+            return {name: zf.read(name) for name in zf.namelist()}
+    
+    def _expected(self):
+        return {f'src/{path.name}': path.read_bytes() for path in self.source.iterdir()}
+    
+    def test_update_refreshes_only_changed_files(self):
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                engine = CompressionEngine(workers=workers, listing_cache=False)
+                output = self.root / f'out{workers}.zip'
+                engine.compress(str(self.source), str(output), 'zip')
+                
+                changed = self.source / 'f1.txt'
+                changed.write_bytes(b'changed\n')
+                os.utime(changed, (1_000_000_000, 1_000_000_000))
+                (self.source / 'new.txt').write_bytes(b'new\n')
+                (self.source / 'f2.txt').unlink()
+                
+                result = engine.compress(str(self.source), str(output), 'zip', update=True)
+                self.assertEqual(result['reused'], 4)
+                self.assertEqual(self._contents(output), self._expected())
+                self.assertFalse(output.with_name(output.name + '.tmp').exists())
+                
+                # Put the source back for the next worker count
+                for i in (1, 2):
+                    (self.source / f'f{i}.txt').write_bytes(f'file {i}\n'.encode() * 2000)
+                (self.source / 'new.txt').unlink()
+    
+    def test_verify_crc_catches_same_size_and_mtime(self):
+        engine = CompressionEngine(workers=1, listing_cache=False)
+        output = self.root / 'out.zip'
+        engine.compress(str(self.source), str(output), 'zip')
+        
+        # Same length and mtime, different bytes
+        target = self.source / 'f3.txt'
+        st = target.stat()
+        target.write_bytes(target.read_bytes().replace(b'file', b'FILE'))
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        
+        result = engine.compress(str(self.source), str(output), 'zip', update=True)
+        self.assertEqual(result['reused'], 6)
+        result = engine.compress(str(self.source), str(output), 'zip', update=True, verify_crc=True)
+        self.assertEqual(result['reused'], 5)
+        self.assertEqual(self._contents(output), self._expected())
+    
+    def test_cancelled_update_keeps_archive(self):
+        output = self.root / 'out.zip'
+        CompressionEngine(listing_cache=False).compress(str(self.source), str(output), 'zip')
+        before = output.read_bytes()
+        
+        (self.source / 'f0.txt').write_bytes(b'changed\n')
+        token = CancelToken()
+        
+        def cancel_midway(event):
+            if event.files >= 3:
+                token.cancel()
+        
+        engine = CompressionEngine(cancel_midway, listing_cache=False)
+        engine.progress.interval = 0
+        with self.assertRaises(OperationCancelled):
+            engine.compress(str(self.source), str(output), 'zip', cancel_token=token, update=True)
+        self.assertEqual(output.read_bytes(), before)
+        self.assertFalse(output.with_name(output.name + '.tmp').exists())
+
+
+
+class DedupTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        (source / 'copy').mkdir(parents=True)
+        payload = os.urandom(100000)
+        for name in ('a.bin', 'copy/a.bin', 'copy/b.bin'):
+            (source / name).write_bytes(payload)
+        # Same size as the duplicates but different content
+        (source / 'other.bin').write_bytes(os.urandom(100000))
+        (source / 'small.txt').write_bytes(b'x')
+        self.source = source
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _expected(self):
+        return {path.relative_to(self.root).as_posix(): path.read_bytes()
+                for path in self.source.rglob('*') if path.is_file()}
+    
+    def test_zip_stores_duplicates_once(self):
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                engine = CompressionEngine(workers=workers, listing_cache=False)
+                output = self.root / f'dedup{workers}.zip'
+                result = engine.compress(str(self.source), str(output), 'zip', dedup=True)
+                self.assertEqual(result['deduplicated'], 2)
+                with zipfile.ZipFile(output) as zf:
+                    self.assertIsNone(zf.testzip())
+                    self.assertEqual({name: zf.read(name) for name in zf.namelist()}, self._expected())
+                    # Duplicates carry the first copy's compressed bytes
+                    sizes = {zf.getinfo(f'src/{name}').compress_size
+                             for name in ('a.bin', 'copy/a.bin', 'copy/b.bin')}
+                    self.assertEqual(len(sizes), 1)
+    
+    def test_tar_links_duplicates(self):
+        engine = CompressionEngine(listing_cache=False)
+        output = self.root / 'dedup.tar.gz'
+        result = engine.compress(str(self.source), str(output), 'tar.gz', dedup=True)
+        self.assertEqual(result['deduplicated'], 2)
+        with tarfile.open(output) as tf:
+            links = sorted(member.name for member in tf if member.islnk())
+        self.assertEqual(len(links), 2)
+        
+        engine.decompress(str(output), str(self.root / 'out'))
+        extracted = {path.relative_to(self.root / 'out').as_posix(): path.read_bytes()
+                     for path in (self.root / 'out').rglob('*') if path.is_file()}
+        self.assertEqual(extracted, self._expected())
+    
+    def test_zip_stream_keeps_full_copies(self):
+        buffer = io.BytesIO()
+        result = CompressionEngine(listing_cache=False).compress(str(self.source), buffer, 'zip', dedup=True)
+        self.assertEqual(result['deduplicated'], 0)
+        with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as zf:
+            self.assertEqual({name: zf.read(name) for name in zf.namelist()}, self._expected())
+
+
+if __name__ == '__main__':
+    unittest.main()
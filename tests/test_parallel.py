@@ -0,0 +1,175 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from linrz import (CompressionEngine, _ParallelBz2Reader, _ParallelBz2Writer, _ParallelGzipWriter,
+                   _ParallelXzWriter)
+
+
+class _SmallGzipWriter(_ParallelGzipWriter):
+    BLOCK_SIZE = 64 * 1024
+
+
+class _SmallBz2Writer(_ParallelBz2Writer):
+    BLOCK_SIZE = 100 * 1000
+
+
+class _SmallXzWriter(_ParallelXzWriter):
+    BLOCK_SIZE = 64 * 1024
+
+
+def _sample(size):
+    """Partly compressible data of the given length"""
+    pattern = os.urandom(1024) + b'linrz ' * 500
+    return (pattern * (size // len(pattern) + 1))[:size]
+
+
+class ParallelGzipWriterTest(unittest.TestCase):
+    def test_round_trip(self):
+        block = _SmallGzipWriter.BLOCK_SIZE
+        for size in (0, 1000, block, 3 * block, 3 * block + 1):
+            for level in (1, 9):
+                with self.subTest(size=size, level=level):
+                    data = _sample(size)
+                    buffer = io.BytesIO()
+                    with _SmallGzipWriter(buffer, level, workers=4) as writer:
+                        for start in range(0, size, 40000):
+                            writer.write(data[start:start + 40000])
+                    # gzip checks the CRC32 and length combined across blocks
+                    self.assertEqual(gzip.decompress(buffer.getvalue()), data)
+    
+    def test_blocks_reference_previous_window(self):
+        # A repeating pattern only stays small across block starts if each
+        # block is primed with the end of the one before
+        pattern = os.urandom(16 * 1024)
+        data = pattern * (8 * _SmallGzipWriter.BLOCK_SIZE // len(pattern))
+        buffer = io.BytesIO()
+        with _SmallGzipWriter(buffer, 6, workers=4) as writer:
+            writer.write(data)
+        self.assertLess(len(buffer.getvalue()), 3 * len(pattern))
+        self.assertEqual(gzip.decompress(buffer.getvalue()), data)
+
+
+class ParallelBz2Test(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _write(self, data):
+        path = self.root / 'data.bz2'
+        with open(path, 'wb') as f, _SmallBz2Writer(f, 9, workers=4) as writer:
+            for start in range(0, len(data), 40000):
+                writer.write(data[start:start + 40000])
+        return path
+    
+    def _read(self, path, reader_class=_ParallelBz2Reader):
+        chunks = []
+        with reader_class(path, workers=4) as reader:
+            while chunk := reader.read(30000):
+                chunks.append(chunk)
+        return b''.join(chunks)
+    
+    def test_round_trip(self):
+        block = _SmallBz2Writer.BLOCK_SIZE
+        for size in (0, 1000, block, 7 * block, 7 * block + 1):
+            with self.subTest(size=size):
+                data = _sample(size)
+                path = self._write(data)
+                self.assertEqual(bz2.decompress(path.read_bytes()), data)
+                self.assertEqual(self._read(path), data)
+                self.assertEqual(_ParallelBz2Reader.is_multistream(path), size > block)
+    
+    def test_single_stream_is_not_multistream(self):
+        path = self.root / 'single.bz2'
+        path.write_bytes(bz2.compress(_sample(500000)))
+        self.assertFalse(_ParallelBz2Reader.is_multistream(path))
+    
+    def test_large_segment_falls_back_to_streaming(self):
+        class SmallSegments(_ParallelBz2Reader):
+            SEGMENT_LIMIT = 30000
+        
+        # Random data keeps some streams above the segment limit
+        data = b''.join(_sample(50000) + os.urandom(50000) for _ in range(4))
+        path = self._write(data)
+        self.assertEqual(self._read(path, SmallSegments), data)
+
+
+class ParallelXzWriterTest(unittest.TestCase):
+    def test_round_trip(self):
+        block = _SmallXzWriter.BLOCK_SIZE
+        for size in (0, 1000, block, 3 * block, 3 * block + 1):
+            for preset in (0, 6, 9):
+                with self.subTest(size=size, preset=preset):
+                    data = _sample(size)
+                    buffer = io.BytesIO()
+                    with _SmallXzWriter(buffer, preset, workers=4) as writer:
+                        # Uneven writes so blocks do not line up with calls
+                        for start in range(0, size, 40000):
+                            writer.write(data[start:start + 40000])
+                    buffer.seek(0)
+                    with lzma.open(buffer) as f:
+                        self.assertEqual(f.read(), data)
+    
+    def test_default_block_size(self):
+        data = _sample(2 * _ParallelXzWriter.BLOCK_SIZE)
+        buffer = io.BytesIO()
+        with _ParallelXzWriter(buffer, 0, workers=2) as writer:
+            writer.write(data)
+        self.assertEqual(lzma.decompress(buffer.getvalue()), data)
+
+
+
+class ParallelZipTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        (source / 'sub').mkdir(parents=True)
+        for i in range(30):
+            (source / 'sub' / f'f{i}.txt').write_bytes(_sample(1000 + i * 3000))
+        (source / 'empty').write_bytes(b'')
+        (source / 'photo.jpg').write_bytes(os.urandom(50000))
+        (source / 'big.bin').write_bytes(_sample(300000))
+        self.source = source
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _compress(self, name, workers):
+        engine = CompressionEngine(workers=workers, listing_cache=False)
+        # Small limits so members take every path: buffered, streamed and held back
+        engine.PARALLEL_MEMBER_LIMIT = 100000
+        engine.PARALLEL_BUFFER_LIMIT = 150000
+        output = self.root / name
+        engine.compress(str(self.source), str(output), 'zip')
+        return output
+    
+    def test_matches_serial_output(self):
+        serial = self._compress('serial.zip', 1)
+        parallel = self._compress('parallel.zip', 4)
+        self.assertEqual(parallel.read_bytes(), serial.read_bytes())
+        
+        with zipfile.ZipFile(parallel) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.getinfo('src/photo.jpg').compress_type, zipfile.ZIP_STORED)
+            for path in self.source.rglob('*'):
+                if path.is_dir():
+                    continue
+                name = path.relative_to(self.root).as_posix()
+                self.assertEqual(zf.read(name), path.read_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
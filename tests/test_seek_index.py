@@ -0,0 +1,114 @@
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from linrz import CompressionEngine, GzipSeekIndex, _GzipSeekReader, _ParallelGzipWriter
+
+
+class _SmallGzipWriter(_ParallelGzipWriter):
+    BLOCK_SIZE = 64 * 1024
+
+
+class _RecordingEngine(CompressionEngine):
+    """Remembers whether the last tar extraction went through a seek index"""
+    
+    indexed = None
+    
+    def _extract_tar_indexed(self, archive, index, output_path, selection):
+        self.indexed = super()._extract_tar_indexed(archive, index, output_path, selection)
+        return self.indexed
+
+
+def _tar_bytes(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tf:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class SeekIndexTest(unittest.TestCase):
+    SPAN = 64 * 1024
+    
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.engine = _RecordingEngine(listing_cache=False)
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def _write_archive(self, files, compresslevel=6):
+        """Write files as a .tar.gz flushed between blocks, like pigz output"""
+        archive = self.root / 'data.tar.gz'
+        tar = _tar_bytes(files)
+        with open(archive, 'wb') as f, _SmallGzipWriter(f, compresslevel, workers=4) as writer:
+            writer.write(tar)
+        return archive, tar
+    
+    def _assert_points_resume(self, archive, index, tar):
+        """Every access point must reproduce the tar data that follows it"""
+        with open(archive, 'rb') as f:
+            for point in index.points:
+                reader = _GzipSeekReader(f, index.point_before(point.uncompressed))
+                self.assertEqual(reader.read(4096), tar[point.uncompressed:point.uncompressed + 4096])
+    
+    def _extract(self, archive, names, output):
+        self.engine.indexed = None
+        self.engine.decompress(str(archive), str(self.root / output), include=names)
+        return {name: (self.root / output / name).read_bytes() for name in names}
+    
+    def test_extract_members_through_index(self):
+        files = {f'd/f{i}.bin': os.urandom(1000) * (30 + i * 7) for i in range(12)}
+        archive, tar = self._write_archive(files)
+        index = self.engine.build_seek_index(archive, span=self.SPAN)
+        self.assertGreater(len(index.points), 10)
+        self._assert_points_resume(archive, index, tar)
+        
+        names = ['d/f9.bin', 'd/f2.bin', 'd/f11.bin']
+        extracted = self._extract(archive, names, 'out')
+        self.assertTrue(self.engine.indexed)
+        self.assertEqual(extracted, {name: files[name] for name in names})
+    
+    def test_stale_index_is_ignored(self):
+        archive, _ = self._write_archive({'a.txt': b'old\n' * 50000, 'b.txt': b'b'})
+        self.engine.build_seek_index(archive, span=self.SPAN)
+        stat = archive.stat()
+        
+        # Same name, new content and mtime: the saved offsets no longer apply
+        self._write_archive({'a.txt': b'new\n' * 60000, 'b.txt': b'b'})
+        os.utime(archive, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(GzipSeekIndex.load_for(archive))
+        
+        extracted = self._extract(archive, ['a.txt'], 'out')
+        self.assertIsNone(self.engine.indexed)
+        self.assertEqual(extracted['a.txt'], b'new\n' * 60000)
+    
+    def test_false_flush_marker_candidates(self):
+        # At level 0 the data is copied into stored blocks, so the marker
+        # bytes inside it appear in the compressed stream off any boundary
+        marker = b'\x00\x00\xff\xff'
+        files = {f'm{i}.bin': (marker + os.urandom(60)) * (2000 + i * 500) for i in range(6)}
+        archive, tar = self._write_archive(files, compresslevel=0)
+        self.assertGreater(archive.read_bytes().count(marker), 10000)
+        
+        # A span off the block size makes points fall due between real flushes
+        index = self.engine.build_seek_index(archive, span=50000)
+        self.assertGreater(len(index.points), 5)
+        self._assert_points_resume(archive, index, tar)
+        
+        extracted = self._extract(archive, ['m5.bin', 'm1.bin'], 'out')
+        self.assertTrue(self.engine.indexed)
+        self.assertEqual(extracted, {name: files[name] for name in ('m5.bin', 'm1.bin')})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from linrz import CompressionEngine
+
+
+def _pipe_from(path):
+    """A non-seekable read end of a pipe fed with the contents of path"""
+    read_fd, write_fd = os.pipe()
+    
+    def feed():
+        with open(path, 'rb') as src, os.fdopen(write_fd, 'wb') as dest:
+            while block := src.read(64 * 1024):
+                dest.write(block)
+    
+    threading.Thread(target=feed, daemon=True).start()
+    return os.fdopen(read_fd, 'rb')
+
+
+class StreamExtractionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / 'src'
+        (source / 'sub').mkdir(parents=True)
+        (source / 'a.txt').write_bytes(b'hello\n' * 1000)
+        (source / 'sub' / 'b.bin').write_bytes(os.urandom(200 * 1024))
+        self.source = source
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def test_extract_from_non_seekable_stream(self):
+        for fmt in ('tar', 'tar.gz', 'tar.bz2', 'tar.xz'):
+            for workers in (1, 2):
+                with self.subTest(fmt=fmt, workers=workers):
+                    engine = CompressionEngine(workers=workers, listing_cache=False)
+                    archive = self.root / f'out{workers}.{fmt}'
+                    engine.compress(self.source, archive, fmt)
+                    output = self.root / f'x-{fmt}-{workers}'
+                    with _pipe_from(archive) as stream:
+                        self.assertFalse(stream.seekable())
+                        engine.decompress(stream, output)
+                    for name in ('a.txt', 'sub/b.bin'):
+                        self.assertEqual((output / 'src' / name).read_bytes(),
+                                         (self.source / name).read_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()